@@ -0,0 +1,91 @@
+"""Compare picking from full scoring with picking from rotating candidate pools.
+
+A labeling session is simulated with an oracle labeling each pick with its true label.
+Quality is measured at each pick by the rank of the picked record among all unlabeled
+records scored by the current model (100% being the most uncertain one), and at the end
+of the session by the accuracy of the model on the remaining unlabeled records.
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.generators import make_labeled_transactions
+from budget.ml.active_learning.features import FeatureCache
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import Dataset
+from budget.ml.active_learning.strategies import AmbiguousStrategy, CandidatePool
+
+N_ROWS = 50_000
+N_SEED_LABELS = 150
+N_PICKS = 40
+POOL_SIZE = 2_000
+RESCORE_EVERY = 20
+
+POOLS = {
+    "full scoring": None,
+    "random pool": CandidatePool(size=POOL_SIZE, rescore_every=RESCORE_EVERY),
+    "stratified pool": CandidatePool(size=POOL_SIZE, stratified=True, rescore_every=RESCORE_EVERY),
+}
+
+
+def reset_labels(dataset: Dataset, truth: np.ndarray) -> None:
+    for index in dataset.labeled_indices():
+        dataset.set_label(int(index), None)
+    for index in range(N_SEED_LABELS):
+        dataset.set_label(index, truth[index])
+
+
+def pick_rank(strategy: AmbiguousStrategy, dataset: Dataset, index: int) -> float:
+    """Share of unlabeled records less uncertain than the picked one, for the current model."""
+    unlabeled = np.flatnonzero(dataset.get_unlabeled())
+    scores = strategy.uncertainty.score(strategy.predict_proba(dataset, unlabeled))
+    return float(np.mean(scores <= scores[np.searchsorted(unlabeled, index)]))
+
+
+def simulate(strategy: AmbiguousStrategy, dataset: Dataset, truth: np.ndarray) -> dict:
+    latencies, ranks = [], []
+    for _ in range(N_PICKS):
+        start = perf_counter()
+        pick = strategy.pick(dataset)
+        latencies.append(perf_counter() - start)
+        ranks.append(pick_rank(strategy, dataset, pick.record.index))
+        pick.record.label_as(truth[pick.record.index])
+
+    strategy.fit(dataset)
+    unlabeled = np.flatnonzero(dataset.get_unlabeled())
+    proba = strategy.predict_proba(dataset, unlabeled)
+    predicted = strategy.classifier.classes_[proba.argmax(axis=1)]
+    return {
+        "mean_latency": np.mean(latencies),
+        "p95_latency": np.percentile(latencies, 95),
+        "mean_rank": np.mean(ranks),
+        "accuracy": np.mean(predicted == truth[unlabeled]),
+    }
+
+
+def main() -> None:
+    transactions = make_labeled_transactions(N_ROWS)
+    truth = transactions.pop("label").to_numpy()
+    dataset = Dataset.from_dataframe(transactions)
+    features = FeatureCache(get_default_model()[:-1])
+    features.get(dataset)
+
+    print(f"{N_ROWS} rows, {N_PICKS} picks, pools of {POOL_SIZE} rescored every {RESCORE_EVERY}")
+    print(
+        f"{'scoring':>16} {'mean pick (s)':>14} {'p95 pick (s)':>13}"
+        f" {'pick rank':>10} {'accuracy':>9}"
+    )
+    for name, pool in POOLS.items():
+        reset_labels(dataset, truth)
+        strategy = AmbiguousStrategy(model=get_default_model(), refit=True, pool=pool)
+        strategy.features = features
+        result = simulate(strategy, dataset, truth)
+        print(
+            f"{name:>16} {result['mean_latency']:>14.3f} {result['p95_latency']:>13.3f}"
+            f" {result['mean_rank']:>9.1%} {result['accuracy']:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
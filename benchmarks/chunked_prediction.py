@@ -0,0 +1,46 @@
+"""Scoring throughput of `ChunkedPredictor` depending on its number of workers.
+
+Threads predict with the classifier on cached features, processes with the whole
+pipeline, as `AmbiguousStrategy` does with and without ``cache_features``. Each pool is
+warmed up by a first prediction, and only the second one is timed.
+"""
+
+import os
+from time import perf_counter
+
+from benchmarks.generators import make_labeled_transactions
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.prediction import Backend, ChunkedPredictor
+
+N_ROWS = 200_000
+N_LABELED = 5_000
+CHUNK_SIZE = 20_000
+N_JOBS = [1, 2, 4, 8]
+
+
+def main() -> None:
+    transactions = make_labeled_transactions(N_ROWS)
+    labels = transactions.pop("label").to_numpy()
+    model = get_default_model()
+    model.fit(transactions.iloc[:N_LABELED], labels[:N_LABELED])
+    preprocessor, classifier = model[:-1], model[-1]
+    X = preprocessor.transform(transactions).tocsr()
+    inputs = {Backend.THREAD: (classifier, X), Backend.PROCESS: (model, transactions)}
+
+    print(f"{N_ROWS} rows by chunks of {CHUNK_SIZE}, {os.cpu_count()} cores")
+    print(f"{'backend':>8} {'jobs':>5} {'time (s)':>9} {'rows/s':>10}")
+    for backend, (estimator, features) in inputs.items():
+        for n_jobs in N_JOBS:
+            with ChunkedPredictor(
+                chunk_size=CHUNK_SIZE, n_jobs=n_jobs, backend=backend
+            ) as predictor:
+                # Warm-up, so that starting the pool and shipping the model isn't timed
+                predictor.predict_proba(estimator, features)
+                start = perf_counter()
+                predictor.predict_proba(estimator, features)
+                elapsed = perf_counter() - start
+            print(f"{backend:>8} {n_jobs:>5} {elapsed:>9.2f} {N_ROWS / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
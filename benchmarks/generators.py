@@ -0,0 +1,180 @@
+"""Synthetic transactions and bank exports shared by the benchmarks."""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from budget.categories import Category
+from budget.ml.active_learning.models import Dataset
+
+# A few real merchants per label, completed with generated ones
+MERCHANTS = {
+    Category.BANK_INSURANCE: ["AXA ASSURANCES", "MAIF", "FRAIS TENUE COMPTE"],
+    Category.CASH: ["RETRAIT DAB"],
+    Category.CONSUMER_GOODS: ["AMAZON EU", "FNAC", "DECATHLON", "IKEA"],
+    Category.EDUCATION: ["CNED", "LIBRAIRIE GIBERT"],
+    Category.ENERGY: ["EDF", "ENGIE", "TOTALENERGIES"],
+    Category.FOOD: ["CARREFOUR", "LECLERC", "MONOPRIX", "PICARD", "LIDL"],
+    Category.HEALTHCARE: ["PHARMACIE", "DOCTOLIB", "CPAM"],
+    Category.HOUSING: ["LOYER", "FONCIA", "LEROY MERLIN"],
+    Category.INCOME: ["SALAIRE", "CAF"],
+    Category.LEISURE: ["NETFLIX", "SPOTIFY", "UGC CINE"],
+    Category.PHONE_INTERNET: ["FREE MOBILE", "ORANGE", "SFR"],
+    Category.RESTAURANT: ["MCDONALDS", "DELIVEROO", "UBER EATS"],
+    Category.SAVINGS: ["LIVRET A", "PEL"],
+    Category.TAXES: ["DGFIP IMPOTS", "TAXE FONCIERE"],
+    Category.TRANSPORTATION: ["SNCF", "RATP", "UBER", "TOTAL ACCESS"],
+}
+
+# Typical amount (mean, standard deviation) per label
+AMOUNTS = {
+    Category.INCOME: (2500, 400),
+    Category.SAVINGS: (-200, 100),
+    Category.HOUSING: (-700, 200),
+    Category.TAXES: (-300, 150),
+}
+DEFAULT_AMOUNT = (-40, 25)
+
+# How the banks categorize transactions of each label, accents included
+BANK_CATEGORIES = {
+    Category.BANK_INSURANCE: ("Banque et assurances", "Frais bancaires"),
+    Category.CASH: ("Retraits", "Retrait d'espèces"),
+    Category.CONSUMER_GOODS: ("Achats et shopping", "Équipement"),
+    Category.EDUCATION: ("Éducation", "Scolarité"),
+    Category.ENERGY: ("Logement", "Électricité et gaz"),
+    Category.FOOD: ("Alimentation", "Supermarché"),
+    Category.HEALTHCARE: ("Santé", "Pharmacie"),
+    Category.HOUSING: ("Logement", "Loyer"),
+    Category.INCOME: ("Revenus", "Salaire"),
+    Category.LEISURE: ("Loisirs", "Abonnements"),
+    Category.PHONE_INTERNET: ("Télécom", "Téléphonie"),
+    Category.RESTAURANT: ("Alimentation", "Restauration rapide"),
+    Category.SAVINGS: ("Épargne", "Virement épargne"),
+    Category.TAXES: ("Impôts et taxes", "Impôt sur le revenu"),
+    Category.TRANSPORTATION: ("Transports", "Train et métro"),
+}
+
+PREFIXES = ["CB {merchant} {day:02d}/{month:02d}", "PRLV SEPA {merchant}", "VIR {merchant}"]
+
+
+def make_merchants(n_merchants: int, seed: int = 0) -> pd.DataFrame:
+    """Merchant names and labels, real ones first then generated ones."""
+    rng = np.random.default_rng(seed)
+    merchants = [(name, label) for label, names in MERCHANTS.items() for name in names]
+    labels = list(Category)
+    syllables = ["MA", "LO", "RI", "TEC", "BO", "NE", "VA", "SU", "PER", "DI", "CO", "FA"]
+    while len(merchants) < n_merchants:
+        name = "".join(rng.choice(syllables, size=rng.integers(2, 4)))
+        merchants.append(
+            (f"{name} {rng.choice(['SA', 'SAS', 'SARL', 'SHOP'])}", rng.choice(labels))
+        )
+    return pd.DataFrame(merchants[:n_merchants], columns=["merchant", "label"])
+
+
+def make_labeled_transactions(n: int, n_merchants: int = 300, seed: int = 0) -> pd.DataFrame:
+    """Normalized transactions along with their true label.
+
+    Merchants follow a Zipf-like distribution, so a few of them account for most
+    transactions, like in a real account history.
+    """
+    rng = np.random.default_rng(seed)
+    merchants = make_merchants(n_merchants, seed)
+    weights = 1 / np.arange(1, n_merchants + 1)
+    picked = rng.choice(n_merchants, size=n, p=weights / weights.sum())
+    labels = merchants["label"].to_numpy()[picked]
+
+    dates = pd.Timestamp("2015-01-01") + pd.to_timedelta(rng.integers(0, 3650, size=n), unit="D")
+    templates = rng.choice(PREFIXES, size=n)
+    names = merchants["merchant"].to_numpy()[picked]
+    descriptions = [
+        template.format(merchant=name, day=date.day, month=date.month)
+        for template, name, date in zip(templates, names, dates)
+    ]
+
+    means, stds = np.transpose([AMOUNTS.get(label, DEFAULT_AMOUNT) for label in labels])
+    amounts = rng.normal(means, stds).round(2)
+
+    # The bank's own categorization agrees with the label most of the time
+    noisy = rng.random(n) < 0.2
+    categories = np.where(noisy, rng.choice(list(Category), size=n), labels)
+    return pd.DataFrame(
+        {
+            "event_date": dates.strftime("%Y-%m-%d"),
+            "event_datetime": dates.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "description": descriptions,
+            "amount": amounts,
+            "category": [f"Categorie {category}" for category in categories],
+            "subcategory": "Sous-categorie",
+            "label": [str(label) for label in labels],
+        }
+    )
+
+
+def make_labeled_dataset(n: int, n_labeled: int, seed: int = 0) -> Dataset:
+    """Dataset of synthetic transactions, the first ``n_labeled`` of which are labeled."""
+    transactions = make_labeled_transactions(n, seed=seed)
+    labels = transactions.pop("label").to_numpy(dtype=object)
+    labels[n_labeled:] = None
+    return Dataset(features=transactions, labels=labels)
+
+
+def _get_bank_categories(labels: pd.Series) -> tuple[pd.Series, pd.Series]:
+    categories = labels.map(lambda label: BANK_CATEGORIES[Category(label)])
+    return categories.str[0], categories.str[1]
+
+
+def write_banque_populaire_csv(path: Path | str, n: int, seed: int = 0) -> None:
+    """Banque Populaire export of ``n`` synthetic transactions, in latin-1 with French decimals."""
+    transactions = make_labeled_transactions(n, seed=seed)
+    dates = pd.to_datetime(transactions["event_date"]).dt.strftime("%d/%m/%Y")
+    amounts = transactions["amount"]
+    category, subcategory = _get_bank_categories(transactions["label"])
+    export = pd.DataFrame(
+        {
+            "Date de comptabilisation": dates,
+            "Libelle simplifie": transactions["description"].str.split().str[:2].str.join(" "),
+            "Libelle operation": transactions["description"],
+            "Reference": np.arange(n) + 100_000,
+            "Informations complementaires": "",
+            "Type operation": np.where(amounts < 0, "Carte bancaire", "Virement reçu"),
+            "Categorie": category,
+            "Sous categorie": subcategory,
+            "Debit": amounts.where(amounts < 0),
+            "Credit": amounts.where(amounts >= 0),
+            "Date operation": dates,
+            "Date de valeur": dates,
+            "Pointage operation": 0,
+        }
+    )
+    export.to_csv(path, sep=";", decimal=",", float_format="%.2f", encoding="latin", index=False)
+
+
+def write_credit_lyonnais_csv(path: Path | str, n: int, seed: int = 0) -> None:
+    """Crédit Lyonnais export of ``n`` synthetic transactions.
+
+    Like real exports, it has no header but starts and ends with a balance line, and
+    amounts have no trailing zeros.
+    """
+    transactions = make_labeled_transactions(n, seed=seed)
+    dates = pd.to_datetime(transactions["event_date"]).dt.strftime("%d/%m/%Y")
+    amounts = transactions["amount"]
+    is_debit = amounts < 0
+    category, _ = _get_bank_categories(transactions["label"])
+    export = pd.DataFrame(
+        {
+            "Date": dates,
+            "Montant": amounts,
+            "Type": np.where(transactions["description"].str.startswith("CB"), "Carte", "Virement"),
+            "Compte": "",
+            "Desc. debit": transactions["description"].where(is_debit),
+            "Desc. credit": transactions["description"].where(~is_debit),
+            "Carte": np.where(is_debit, "0", ""),
+            "Categorie": category,
+        }
+    )
+    balance = f"{dates.iloc[-1]};{amounts.sum():.2f};;00**1 ***966S\n".replace(".", ",")
+    with open(path, "w", encoding="latin", newline="") as file:
+        file.write(balance)
+        export.to_csv(file, sep=";", decimal=",", header=False, index=False)
+        file.write(balance)
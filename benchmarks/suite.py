@@ -0,0 +1,217 @@
+"""Timings of the main operations, written as JSON to compare them between commits.
+
+Each benchmark runs a few rounds on inputs prepared outside of the timed section, and
+reports the statistics of its rounds in the layout of pytest-benchmark::
+
+    python -m benchmarks.suite -o before.json
+    git checkout other-branch
+    python -m benchmarks.suite -o after.json --compare before.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+
+from benchmarks.generators import (
+    make_labeled_dataset,
+    make_labeled_transactions,
+    write_banque_populaire_csv,
+    write_credit_lyonnais_csv,
+)
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import LABEL_COLNAME, Dataset
+from budget.ml.active_learning.strategies import AmbiguousStrategy, RefitPolicy
+from budget.transaction_loader import BanquePopulaireLoader, CreditLyonnaisLoader
+
+
+@dataclass
+class Benchmark:
+    """A timed function, called on the output of an untimed setup at each round."""
+
+    group: str
+    name: str
+    func: Callable[[Any], Any]
+    setup: Callable[[], Any]
+    rows: int
+    warmup: int = 0
+
+
+def get_stats(timings: list[float], rows: int) -> dict[str, float]:
+    quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else timings * 3
+    mean = statistics.fmean(timings)
+    return {
+        "min": min(timings),
+        "max": max(timings),
+        "mean": mean,
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "median": statistics.median(timings),
+        "iqr": quartiles[2] - quartiles[0],
+        "rounds": len(timings),
+        "ops": 1 / mean,
+        "rows_per_second": rows / mean,
+    }
+
+
+def run(benchmark: Benchmark, rounds: int) -> dict:
+    timings = []
+    for round_ in range(benchmark.warmup + rounds):
+        arg = benchmark.setup()
+        start = perf_counter()
+        benchmark.func(arg)
+        elapsed = perf_counter() - start
+        if round_ >= benchmark.warmup:
+            timings.append(elapsed)
+    return {
+        "group": benchmark.group,
+        "name": benchmark.name,
+        "params": {"rows": benchmark.rows},
+        "stats": get_stats(timings, benchmark.rows),
+    }
+
+
+def get_benchmarks(tmp_dir: Path, n_rows: int, n_labeled: int) -> list[Benchmark]:
+    banque_populaire = tmp_dir / "banque_populaire.csv"
+    write_banque_populaire_csv(banque_populaire, n_rows)
+    credit_lyonnais = tmp_dir / "credit_lyonnais.csv"
+    write_credit_lyonnais_csv(credit_lyonnais, n_rows)
+
+    transactions = make_labeled_transactions(n_rows).rename(columns={"label": LABEL_COLNAME})
+    dataset = Dataset.from_dataframe(transactions)
+    training_tx = transactions.iloc[:n_labeled]
+
+    # Same transactions, only partly labeled
+    picked = make_labeled_dataset(n_rows, n_labeled)
+    true_labels = transactions[LABEL_COLNAME].to_numpy()
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=RefitPolicy(every=1))
+
+    def label_next_record() -> Dataset:
+        """A new label, as in the labeling loop, so that each pick refits the classifier."""
+        index = int(np.flatnonzero(picked.get_unlabeled())[0])
+        picked.set_label(index, true_labels[index])
+        return picked
+
+    return [
+        Benchmark(
+            "loader",
+            "BanquePopulaireLoader.read",
+            lambda path: BanquePopulaireLoader().read(path),
+            lambda: banque_populaire,
+            n_rows,
+        ),
+        Benchmark(
+            "loader",
+            "CreditLyonnaisLoader.read",
+            lambda path: CreditLyonnaisLoader().read(path),
+            lambda: credit_lyonnais,
+            n_rows,
+        ),
+        Benchmark(
+            "dataset",
+            "Dataset.from_dataframe",
+            Dataset.from_dataframe,
+            lambda: transactions,
+            n_rows,
+        ),
+        Benchmark("dataset", "Dataset.to_dataframe", Dataset.to_dataframe, lambda: dataset, n_rows),
+        Benchmark(
+            "dataset",
+            "Dataset.dump",
+            lambda dataset: dataset.dump(tmp_dir / "dump.parquet"),
+            lambda: dataset,
+            n_rows,
+        ),
+        Benchmark(
+            "model",
+            "get_default_model().fit",
+            lambda model: model.fit(training_tx, training_tx[LABEL_COLNAME]),
+            get_default_model,
+            n_labeled,
+        ),
+        # The first pick transforms the features of the whole dataset
+        Benchmark(
+            "strategy",
+            "AmbiguousStrategy.pick",
+            strategy.pick,
+            label_next_record,
+            n_rows,
+            warmup=1,
+        ),
+    ]
+
+
+def get_commit_info() -> dict:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {"id": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain"))}
+
+
+def compare(results: list[dict], previous: dict) -> None:
+    """Print the median time of each benchmark next to the one of previous results."""
+    medians = {result["name"]: result["stats"]["median"] for result in previous["benchmarks"]}
+    print(f"\nCompared to {previous['commit_info']['id'][:10]}")
+    print(f"{'benchmark':<28} {'before (s)':>11} {'after (s)':>10} {'ratio':>7}")
+    for result in results:
+        before = medians.get(result["name"])
+        if before is None:
+            continue
+        after = result["stats"]["median"]
+        print(f"{result['name']:<28} {before:>11.4f} {after:>10.4f} {after / before:>6.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="Transactions per benchmark")
+    parser.add_argument("--labeled", type=int, default=2_000, help="Labeled transactions")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name has this")
+    parser.add_argument("-o", "--output", type=Path, help="JSON file to write results to")
+    parser.add_argument("--compare", type=Path, help="JSON results to compare with")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'benchmark':<28} {'median (s)':>11} {'stddev (s)':>11} {'rows/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for benchmark in get_benchmarks(Path(tmp_dir), args.rows, args.labeled):
+            if args.keyword and args.keyword not in benchmark.name:
+                continue
+            result = run(benchmark, args.rounds)
+            stats = result["stats"]
+            print(
+                f"{benchmark.name:<28} {stats['median']:>11.4f} {stats['stddev']:>11.4f}"
+                f" {stats['rows_per_second']:>12.0f}"
+            )
+            results.append(result)
+
+    output = {
+        "machine_info": {
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "commit_info": get_commit_info(),
+        "datetime": datetime.now(UTC).isoformat(),
+        "benchmarks": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(output, indent=2))
+    if args.compare:
+        compare(results, json.loads(args.compare.read_text()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Compare the former argsort-based margin ranking with the in-place uncertainty scorers."""
+
+from time import perf_counter
+
+import numpy as np
+
+from budget.ml.active_learning.scoring import CandidateHeap, Uncertainty, select_most_uncertain
+
+N_ROWS = 1_000_000
+N_CLASSES = 15
+LOOKAHEAD = 100
+RESCORED = 0.1
+
+
+def make_proba(n: int, n_classes: int, seed: int = 0) -> np.ndarray:
+    """Predicted probabilities, peaked on a few labels like a trained classifier's."""
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(np.full(n_classes, 0.3), size=n)
+
+
+def argsort_ranking(proba: np.ndarray, k: int) -> np.ndarray:
+    """Ranking as previously done by AmbiguousStrategy: two full argsorts."""
+    top2_indices = np.argsort(proba, axis=-1)[:, -2:]
+    top2 = np.take_along_axis(proba, top2_indices, axis=-1)
+    gap = np.squeeze(np.diff(top2, axis=-1))
+    return np.argsort(gap, kind="stable")[:k]
+
+
+def scorer_ranking(uncertainty: Uncertainty, proba: np.ndarray, k: int) -> np.ndarray:
+    return select_most_uncertain(uncertainty.score(proba), k)
+
+
+def heap_update(heap: CandidateHeap, positions: np.ndarray, proba: np.ndarray) -> np.ndarray:
+    heap.update(positions, Uncertainty.MARGIN.score(proba))
+    return heap.best(LOOKAHEAD)
+
+
+def timeit(func, *args) -> tuple[float, object]:
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter() - start, result
+
+
+def main() -> None:
+    proba = make_proba(N_ROWS, N_CLASSES)
+    print(f"{N_ROWS} rows x {N_CLASSES} classes, {LOOKAHEAD} candidates")
+    print(f"{'ranking':>28} {'time (s)':>10} {'speedup':>9}")
+
+    baseline, expected = timeit(argsort_ranking, proba, LOOKAHEAD)
+    print(f"{'argsort margin':>28} {baseline:>10.3f} {1:>8.1f}x")
+    for uncertainty in Uncertainty:
+        elapsed, ranking = timeit(scorer_ranking, uncertainty, proba.copy(), LOOKAHEAD)
+        if uncertainty == Uncertainty.MARGIN:
+            assert set(ranking) == set(expected)
+        print(f"{uncertainty:>28} {elapsed:>10.3f} {baseline / elapsed:>8.1f}x")
+
+    heap = CandidateHeap(N_ROWS, capacity=LOOKAHEAD)
+    heap.update(np.arange(N_ROWS), Uncertainty.MARGIN.score(proba.copy()))
+    rng = np.random.default_rng(1)
+    positions = rng.choice(N_ROWS, size=int(N_ROWS * RESCORED), replace=False)
+    rescored = make_proba(len(positions), N_CLASSES, seed=2)
+    elapsed, _ = timeit(heap_update, heap, positions, rescored)
+    label = f"heap, {RESCORED:.0%} rescored"
+    print(f"{label:>28} {elapsed:>10.3f} {baseline / elapsed:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
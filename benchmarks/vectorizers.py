@@ -0,0 +1,78 @@
+"""Compare count and hashing vectorizers of the default pipeline.
+
+The preprocessor is fitted and applied to the whole dataset, as `FeatureCache` does, then
+the classifier is trained on a labeled sample and evaluated on the other records. Each
+configuration runs in a fresh process, whose peak resident memory is measured on top of
+the memory used by the generated transactions.
+"""
+
+import resource
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+import numpy as np
+
+from benchmarks.generators import make_labeled_transactions
+from budget.ml.active_learning.learner import Vectorizer, get_default_model
+
+N_ROWS = 100_000
+N_LABELED = 5_000
+CONFIGS = [
+    (Vectorizer.COUNT, None),
+    (Vectorizer.HASHING, 1024),
+    (Vectorizer.HASHING, 4096),
+    (Vectorizer.HASHING, 16384),
+]
+
+
+def get_peak_memory() -> float:
+    """Peak resident memory of the process, in MiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def run(vectorizer: Vectorizer, n_features: int | None) -> dict:
+    transactions = make_labeled_transactions(N_ROWS)
+    labels = transactions.pop("label").to_numpy()
+    model = get_default_model(vectorizer, n_features)
+    preprocessor, classifier = model[:-1], model[-1]
+
+    baseline = get_peak_memory()
+    start = perf_counter()
+    # Hashing is stateless, fitting it only records the input columns
+    preprocessor.fit(transactions if vectorizer == Vectorizer.COUNT else transactions.head(1))
+    fit_time = perf_counter() - start
+    start = perf_counter()
+    X = preprocessor.transform(transactions).tocsr()
+    transform_time = perf_counter() - start
+    peak = get_peak_memory() - baseline
+
+    classifier.fit(X[:N_LABELED], labels[:N_LABELED])
+    accuracy = np.mean(classifier.predict(X[N_LABELED:]) == labels[N_LABELED:])
+    return {
+        "fit_time": fit_time,
+        "transform_time": transform_time,
+        "peak_memory": peak,
+        "n_columns": X.shape[1],
+        "accuracy": accuracy,
+    }
+
+
+def main() -> None:
+    print(f"{N_ROWS} rows, classifier trained on {N_LABELED} of them")
+    print(
+        f"{'vectorizer':>16} {'columns':>8} {'fit (s)':>8} {'transform (s)':>14}"
+        f" {'peak (MiB)':>11} {'accuracy':>9}"
+    )
+    for vectorizer, n_features in CONFIGS:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(run, vectorizer, n_features).result()
+        name = f"{vectorizer}" + (f" {n_features}" if n_features else "")
+        print(
+            f"{name:>16} {result['n_columns']:>8} {result['fit_time']:>8.2f}"
+            f" {result['transform_time']:>14.2f} {result['peak_memory']:>11.0f}"
+            f" {result['accuracy']:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
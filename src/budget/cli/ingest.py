@@ -0,0 +1,59 @@
+"""Ingestion CLI"""
+
+from typing import List, Optional
+
+from typer import Argument, BadParameter, Option, echo
+
+from budget.cli.labeling import Loader
+from budget.transaction_loader import IngestionCache, Source
+from budget.transaction_loader import ingest as ingest_sources
+
+
+def parse_source(value: str) -> Source:
+    loader, sep, pattern = value.partition("=")
+    if not sep:
+        raise BadParameter(f"Expected LOADER=PATTERN, got {value!r}")
+    try:
+        source = Source(pattern=pattern, loader=Loader(loader).loader)
+    except ValueError:
+        raise BadParameter(
+            f"Unknown loader {loader!r}, expected one of {[loader.value for loader in Loader]}"
+        ) from None
+    # A mistyped pattern would silently leave a whole account out
+    if not source.get_paths():
+        raise BadParameter(f"No export file matches {pattern!r}")
+    return source
+
+
+def ingest(
+    sources: List[str] = Argument(
+        ...,
+        metavar="LOADER=PATTERN...",
+        help="Loader and glob pattern (or directory) of the export files of one account",
+    ),
+    output: str = Option(
+        ...,
+        "-o",
+        "--output",
+        help="Parquet file to write consolidated transactions to",
+    ),
+    jobs: Optional[int] = Option(
+        None,
+        "-j",
+        "--jobs",
+        help="Number of worker processes (defaults to the number of cores)",
+    ),
+    cache_dir: Optional[str] = Option(
+        None,
+        "--cache-dir",
+        help="Directory caching normalized files, so that only new or modified files are parsed",
+    ),
+):
+    """Ingest many export files into a single Parquet file."""
+    transactions = ingest_sources(
+        [parse_source(source) for source in sources],
+        output=output,
+        max_workers=jobs,
+        cache=IngestionCache(cache_dir) if cache_dir else None,
+    )
+    echo(f"✅ Ingested {len(transactions)} transactions into {output}")
@@ -1,17 +1,34 @@
 """Labeling CLI"""
 
 from enum import Enum
+from pathlib import Path
 from typing import Optional
-from typer import Exit, Typer, Option, echo
+from typer import Argument, Exit, Typer, Option, echo
 
-import pandas as pd
+import joblib
 
 from budget.categories import Category
 from budget.transaction_loader import BanquePopulaireLoader, CreditLyonnaisLoader
-from budget.ml.active_learning.learner import ActiveLearner, get_default_model
+from budget.ml.active_learning.artifacts import load_model, save_model
+from budget.ml.active_learning.grouping import DescriptionGroups, Propagation
+from budget.ml.active_learning.journal import LabelJournal
+from budget.ml.active_learning.learner import ActiveLearner, Vectorizer, get_default_model
 from budget.ml.active_learning.models import LABEL_COLNAME, Dataset
-from budget.ml.active_learning.strategies import AmbiguousStrategy
-from budget.transaction_loader.base import TransactionLoader
+from budget.ml.active_learning.prediction import (
+    DEFAULT_BATCH_SIZE,
+    Backend,
+    ChunkedPredictor,
+    predict_file,
+    read_labeled,
+)
+from budget.ml.active_learning.scoring import Uncertainty
+from budget.ml.active_learning.strategies import (
+    AmbiguousStrategy,
+    CandidatePool,
+    RefitPolicy,
+)
+from budget.profiling import PROFILER
+from budget.transaction_loader.base import TransactionLoader, index_by_transaction_id
 
 
 cli = Typer(add_completion=False)
@@ -42,48 +59,254 @@ def launch_ui(
         None,
         "-f",
         "--from",
-        help="Transaction file to load (ignored if --resume-from)",
+        help="Transaction file to load, or to add to the dump with --resume-from",
     ),
     resume_from: Optional[str] = Option(
         None,
-        help="Resume labeling from dump",
+        help="Resume labeling from dump, with the labels journaled since it was written",
+    ),
+    account: Optional[str] = Option(
+        None,
+        help="Account of the --from transactions, defaults to the loader name",
     ),
     output: str = Option(
         ...,
         "-o",
         "--output",
-        help="Location to dump checkpoint",
+        help="Location to dump checkpoint, the fitted model is saved next to it",
+    ),
+    refit_every: int = Option(
+        1,
+        help="Refit the model once this many labels were added",
+    ),
+    refit_interval: Optional[float] = Option(
+        None,
+        help="Also refit the model once this many seconds passed, if any label was added",
+    ),
+    warm_start_rounds: Optional[int] = Option(
+        None,
+        help="Add this many boosting rounds to the current model instead of retraining it",
+    ),
+    vectorizer: Vectorizer = Option(
+        Vectorizer.COUNT,
+        help="How to vectorize descriptions and bank categories",
+    ),
+    n_features: Optional[int] = Option(
+        None,
+        help="Number of description features, defaults to 3000 (count) or 4096 (hashing)",
+    ),
+    uncertainty: Uncertainty = Option(
+        Uncertainty.MARGIN,
+        help="How to score the uncertainty of the model on a record",
+    ),
+    pool_size: Optional[int] = Option(
+        None,
+        help="Only score this many records after each refit, rotating over all of them",
+    ),
+    stratified_pool: bool = Option(
+        False,
+        help="Draw pools evenly across predicted labels",
+    ),
+    rescore_every: int = Option(
+        CandidatePool.rescore_every,
+        help="With --pool-size, score all records again after this many pools",
+    ),
+    group_descriptions: bool = Option(
+        False,
+        help="Only pick one record among those with the same normalized description",
+    ),
+    propagate: Propagation = Option(
+        Propagation.NEVER,
+        help="Apply labels to records with the same normalized description",
+    ),
+    batch_size: int = Option(
+        1,
+        help="Number of records to pick per scoring round",
+    ),
+    jobs: int = Option(
+        1,
+        "-j",
+        "--jobs",
+        help="Number of threads scoring records (0 for the number of cores)",
+    ),
+    diverse: bool = Option(
+        False,
+        help="Don't pick records with the same description in a batch",
+    ),
+    compact_every: int = Option(
+        1000,
+        help="Fold the label journal into the checkpoint once it has this many entries",
+    ),
+    profile: bool = Option(
+        False,
+        help="Show the latency of each phase in the UI, and dump them next to the checkpoint",
     ),
 ):
+    PROFILER.enabled = profile
+    if not resume_from and (not _from or not loader):
+        echo(
+            "You need to specify a transaction file (--from) "
+            "and a loader (--loader) to start a labeling session",
+            err=True,
+        )
+        raise Exit(1)
+    resumes_output = resume_from and Path(resume_from).resolve() == Path(output).resolve()
+    if Path(output).exists() and not resumes_output:
+        echo(
+            f"{output} already exists, resume from it (--resume-from {output}) "
+            "or choose another output",
+            err=True,
+        )
+        raise Exit(1)
+    # Labels are journaled next to the output checkpoint, which must hold the dataset
+    # they apply to
+    journal = LabelJournal(output, compact_every=compact_every)
     if resume_from:
-        transactions = pd.read_parquet(resume_from)
+        resumed_journal = journal if resumes_output else LabelJournal(resume_from)
+        dataset = Dataset.from_file(resume_from)
+        n_replayed = resumed_journal.replay(dataset)
+        if n_replayed:
+            echo(f"Replayed {n_replayed} journaled labels")
+        if _from and loader:
+            n_records = len(dataset)
+            transactions = loader.loader.read(_from)
+            dataset = dataset.merge(index_by_transaction_id(transactions, account or loader.value))
+            echo(f"Added {len(dataset) - n_records} new transactions from {_from}")
+            resumed_journal = None
+        if resumed_journal is not journal:
+            journal.compact(dataset)
     else:
-        if not _from or not loader:
-            echo(
-                "You need to specify a transaction file (--from) "
-                "and a loader (--loader) to start a labeling session",
-                err=True,
-            )
-            raise Exit(1)
         transactions = loader.loader.read(_from)
+        dataset = Dataset.from_dataframe(
+            index_by_transaction_id(transactions, account or loader.value)
+        )
+        journal.compact(dataset)
 
-    dataset = Dataset.from_dataframe(transactions)
-    training_dataset = Dataset(records=[*dataset.get_labeled()])
-    training_tx = training_dataset.to_dataframe()
-
-    model = get_default_model()
-    model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
-
-    strategy = AmbiguousStrategy(model=model, refit=True)
+    refit = RefitPolicy(
+        every=refit_every,
+        interval=refit_interval,
+        warm_start_rounds=warm_start_rounds,
+    )
+    groups = None
+    if group_descriptions or propagate != Propagation.NEVER:
+        groups = DescriptionGroups.from_dataset(dataset)
+    pool = None
+    if pool_size:
+        pool = CandidatePool(
+            size=pool_size, stratified=stratified_pool, rescore_every=rescore_every
+        )
+    config = {"vectorizer": vectorizer.value, "n_features": n_features}
+    model = load_model(resume_from, dataset, config) if resume_from else None
+    strategy = AmbiguousStrategy(
+        model=model or get_default_model(vectorizer, n_features),
+        refit=refit,
+        diverse=diverse,
+        uncertainty=uncertainty,
+        pool=pool,
+        groups=groups if group_descriptions else None,
+        predictor=ChunkedPredictor(n_jobs=jobs) if jobs != 1 else None,
+    )
+    if model is None:
+        strategy.fit(dataset)
+    else:
+        echo("Loaded the model fitted on the checkpoint labels")
+        strategy.mark_fitted(dataset)
     learner = ActiveLearner(dataset=dataset, strategy=strategy)
-    learner.launch_tui(labels=Category, save_path=output)
+    try:
+        learner.launch_tui(
+            labels=Category,
+            save_path=output,
+            batch_size=batch_size,
+            groups=groups,
+            propagation=propagate,
+            journal=journal,
+        )
+        journal.compact(dataset)
+    finally:
+        if strategy.predictor is not None:
+            strategy.predictor.close()
 
-    echo("✅ Labeling session completed!")
+    if dataset.n_labeled:
+        if not strategy.is_fitted_on(dataset):
+            strategy.fit(dataset)
+        save_model(strategy.model, dataset, output, config)
 
-    labeled = list(dataset.get_labeled())
-    unlabeled = list(dataset.get_unlabeled())
+    echo("✅ Labeling session completed!")
 
     print("\n📊 Statistics:")
-    print(f"   Labeled: {len(labeled)}")
-    print(f"   Unlabeled: {len(unlabeled)}")
-    print(f"   Total: {len(dataset.records)}")
+    print(f"   Labeled: {dataset.n_labeled}")
+    print(f"   Unlabeled: {dataset.n_unlabeled}")
+    print(f"   Total: {len(dataset)}")
+
+    if profile:
+        profile_path = Path(output).with_suffix(".profile.json")
+        PROFILER.dump(profile_path)
+        print(f"\n⏱️  Latencies (ms), dumped to {profile_path}:")
+        print(PROFILER.format())
+
+
+@cli.command()
+def predict(
+    checkpoint: str = Argument(..., help="Labeling checkpoint to predict labels of"),
+    output: str = Option(
+        ...,
+        "-o",
+        "--output",
+        help="Parquet file to write rows with their predicted label to",
+    ),
+    threshold: float = Option(
+        0.9,
+        help="Only predict labels whose probability reaches this threshold",
+    ),
+    batch_size: int = Option(
+        DEFAULT_BATCH_SIZE,
+        help="Number of rows to predict at once",
+    ),
+    model_path: Optional[str] = Option(
+        None,
+        "--model",
+        help="Fitted pipeline to use instead of the one saved with the checkpoint, if any",
+    ),
+    vectorizer: Vectorizer = Option(
+        Vectorizer.COUNT,
+        help="How to vectorize descriptions and bank categories",
+    ),
+    n_features: Optional[int] = Option(
+        None,
+        help="Number of description features, defaults to 3000 (count) or 4096 (hashing)",
+    ),
+    jobs: int = Option(
+        1,
+        "-j",
+        "--jobs",
+        help="Number of worker processes predicting a batch (0 for the number of cores)",
+    ),
+):
+    if model_path:
+        model = joblib.load(model_path)
+    else:
+        training_tx = read_labeled(checkpoint)
+        if training_tx.empty:
+            echo("The checkpoint has no labeled rows to train a model on", err=True)
+            raise Exit(1)
+        config = {"vectorizer": vectorizer.value, "n_features": n_features}
+        model = load_model(checkpoint, Dataset.from_dataframe(training_tx), config)
+        if model is None:
+            model = get_default_model(vectorizer, n_features)
+            model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
+
+    # The worker processes get the model once, and predict every batch
+    predictor = ChunkedPredictor(n_jobs=jobs, backend=Backend.PROCESS) if jobs != 1 else None
+    try:
+        n_predicted, n_unlabeled = predict_file(
+            model,
+            checkpoint,
+            output,
+            threshold=threshold,
+            batch_size=batch_size,
+            predictor=predictor,
+        )
+    finally:
+        if predictor is not None:
+            predictor.close()
+    echo(f"✅ Predicted {n_predicted} labels out of {n_unlabeled} unlabeled rows to {output}")
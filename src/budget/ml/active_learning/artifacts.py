@@ -0,0 +1,81 @@
+"""Fitted pipelines saved next to labeling checkpoints, to skip training when resuming."""
+
+import hashlib
+import json
+import os
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+import joblib
+import pandas as pd
+
+from budget.ml.active_learning.models import Dataset
+from budget.profiling import PROFILER, SAVE
+
+# Bump when the layout of saved artifacts changes
+ARTIFACT_VERSION = 1
+ARTIFACT_SUFFIX = ".model.joblib"
+METADATA_SUFFIX = ".model.json"
+LIBRARIES = ["scikit-learn", "lightgbm"]
+
+
+def get_artifact_paths(checkpoint: Path | str) -> tuple[Path, Path]:
+    """Where the fitted pipeline of a checkpoint and its metadata are saved.
+
+    The pipeline of ``labels.parquet`` is saved to ``labels.model.joblib``, and its
+    metadata to ``labels.model.json``.
+    """
+    checkpoint = Path(checkpoint)
+    return checkpoint.with_suffix(ARTIFACT_SUFFIX), checkpoint.with_suffix(METADATA_SUFFIX)
+
+
+def fingerprint(training_tx: pd.DataFrame) -> str:
+    """Hash of the rows a pipeline is trained on, labels included, in training order."""
+    hashes = pd.util.hash_pandas_object(training_tx.astype(object), index=False)
+    return hashlib.sha256(hashes.to_numpy().tobytes()).hexdigest()
+
+
+def get_metadata(dataset: Dataset, config: dict | None = None) -> dict:
+    return {
+        "version": ARTIFACT_VERSION,
+        "config": config or {},
+        "fingerprint": fingerprint(dataset.to_dataframe(dataset.labeled_indices())),
+        "libraries": {library: version(library) for library in LIBRARIES},
+    }
+
+
+def save_model(
+    model: Any, dataset: Dataset, checkpoint: Path | str, config: dict | None = None
+) -> None:
+    """Save a pipeline fitted on the current labels of a dataset next to its checkpoint.
+
+    Args:
+        model: The fitted pipeline
+        dataset: The dataset it was fitted on
+        checkpoint: Where the dataset is dumped
+        config: JSON serializable parameters the pipeline was built with
+    """
+    model_path, metadata_path = get_artifact_paths(checkpoint)
+    with PROFILER.phase(SAVE):
+        # Metadata goes first and comes back last, so that it never describes another pipeline
+        metadata_path.unlink(missing_ok=True)
+        tmp_path = model_path.with_suffix(".tmp")
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+        tmp_path.write_text(json.dumps(get_metadata(dataset, config), indent=2, sort_keys=True))
+        os.replace(tmp_path, metadata_path)
+
+
+def load_model(checkpoint: Path | str, dataset: Dataset, config: dict | None = None) -> Any | None:
+    """Pipeline saved next to a checkpoint, if it was fitted on the labels of the dataset.
+
+    Returns ``None`` if there's no pipeline, if it was saved by another version of this
+    module or of the libraries, built with another ``config``, or if labels changed since.
+    """
+    model_path, metadata_path = get_artifact_paths(checkpoint)
+    if not model_path.exists() or not metadata_path.exists():
+        return None
+    if json.loads(metadata_path.read_text()) != get_metadata(dataset, config):
+        return None
+    return joblib.load(model_path)
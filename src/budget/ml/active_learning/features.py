@@ -0,0 +1,39 @@
+from typing import Any
+
+from scipy.sparse import csr_matrix
+from sklearn.exceptions import NotFittedError
+from sklearn.utils.validation import check_is_fitted
+
+from budget.ml.active_learning.models import Dataset
+from budget.profiling import FEATURE_TRANSFORM, PROFILER
+
+
+class FeatureCache:
+    """Feature matrix of a whole dataset, transformed once per fitted preprocessor.
+
+    Training and scoring slice rows of the cached CSR matrix by position, so that a new
+    label only requires fitting the classifier again. The preprocessor is fitted on the
+    features of the whole dataset (labels aren't involved) if it isn't fitted yet. Snapshots
+    of a dataset share its matrix. Call `invalidate` after refitting it elsewhere.
+    """
+
+    def __init__(self, preprocessor: Any) -> None:
+        self.preprocessor = preprocessor
+        self._dataset: Dataset | None = None
+        self._matrix: csr_matrix | None = None
+
+    def get(self, dataset: Dataset) -> csr_matrix:
+        if self._matrix is None or self._dataset is not dataset.origin:
+            with PROFILER.phase(FEATURE_TRANSFORM):
+                try:
+                    check_is_fitted(self.preprocessor)
+                    matrix = self.preprocessor.transform(dataset.features)
+                except NotFittedError:
+                    matrix = self.preprocessor.fit_transform(dataset.features)
+                self._matrix = csr_matrix(matrix)
+            self._dataset = dataset.origin
+        return self._matrix
+
+    def invalidate(self) -> None:
+        self._dataset = None
+        self._matrix = None
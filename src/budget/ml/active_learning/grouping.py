@@ -0,0 +1,96 @@
+"""Grouping of records whose descriptions only differ by dates, card numbers or references."""
+
+import re
+from enum import StrEnum
+
+import numpy as np
+import pandas as pd
+from numpy.typing import NDArray
+
+from budget.ml.active_learning.models import Dataset
+
+DESCRIPTION_COLNAME = "description"
+
+# Applied in order on upper cased descriptions
+NORMALIZATION_PATTERNS = [
+    # Dates: 27/07, 27/07/25, 27.07.2025
+    r"\b\d{1,2}[/.-]\d{1,2}(?:[/.-]\d{2,4})?\b",
+    # Masked card numbers and accounts: CB****1234, 4974XXXX1234, ******E
+    r"\S*(?:\*{2,}|X{4,})\S*",
+    # Reference IDs: REF 123ABC, N° 12345
+    r"(?:\b(?:REF|REFERENCE|NUM|NO)\b|\bN°)[.:\s]*\S+",
+    # Any other token with digits: amounts, transaction numbers
+    r"\S*\d\S*",
+    # Punctuation
+    r"[^\w\s]|_",
+]
+
+_NORMALIZATION = [re.compile(pattern) for pattern in NORMALIZATION_PATTERNS]
+
+
+class Propagation(StrEnum):
+    """Whether a label applied to a record is applied to the rest of its group."""
+
+    NEVER = "never"
+    CONFIRM = "confirm"
+    ALWAYS = "always"
+
+
+def normalize_description(description: object) -> str:
+    """Description stripped of dates, card numbers, reference IDs and punctuation.
+
+    Descriptions with nothing left are kept as is, rather than grouped together.
+    """
+    normalized = str(description).upper()
+    for pattern in _NORMALIZATION:
+        normalized = pattern.sub(" ", normalized)
+    return " ".join(normalized.split()) or str(description)
+
+
+def normalize_descriptions(descriptions: pd.Series) -> pd.Series:
+    """`normalize_description` of each description, only computed once per distinct value."""
+    codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+    normalized = np.array([normalize_description(value) for value in uniques], dtype=object)
+    return pd.Series(normalized[codes], index=descriptions.index)
+
+
+class DescriptionGroups:
+    """Records of a dataset grouped by hash of their normalized description.
+
+    Attributes:
+        codes: Group of each record, from 0 to the number of groups
+    """
+
+    def __init__(self, codes: NDArray[np.intp]) -> None:
+        self.codes = codes
+        self._order = np.argsort(codes, kind="stable")
+        self._offsets = np.r_[0, np.cumsum(np.bincount(codes))]
+
+    @classmethod
+    def from_dataset(cls, dataset: Dataset) -> "DescriptionGroups":
+        normalized = normalize_descriptions(dataset.features[DESCRIPTION_COLNAME])
+        hashes = pd.util.hash_array(normalized.to_numpy(dtype=object))
+        codes, _ = pd.factorize(hashes)
+        return cls(codes.astype(np.intp))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def members(self, index: int) -> NDArray[np.intp]:
+        """Positions of the records in the same group as ``index``, itself included."""
+        group = self.codes[index]
+        return self._order[self._offsets[group] : self._offsets[group + 1]]
+
+    def representatives(self, rows: NDArray[np.intp]) -> NDArray[np.intp]:
+        """First of ``rows`` in each group they belong to."""
+        _, first = np.unique(self.codes[rows], return_index=True)
+        return np.sort(rows[first])
+
+    def propagate(self, dataset: Dataset, index: int) -> NDArray[np.intp]:
+        """Label the unlabeled records of the group of ``index`` like it, return them."""
+        label = dataset.labels[index]
+        members = self.members(index)
+        targets = members[dataset.get_unlabeled()[members]]
+        for target in targets:
+            dataset.set_label(int(target), label)
+        return targets
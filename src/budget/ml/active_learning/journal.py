@@ -0,0 +1,99 @@
+"""Append-only journal of label changes, folded into the Parquet checkpoint from time to time."""
+
+import json
+import os
+from pathlib import Path
+from time import time
+from typing import IO
+
+import numpy as np
+
+from budget.ml.active_learning.models import Dataset
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+
+
+class LabelJournal:
+    """Label changes of a labeling session, appended to a JSON lines file next to its checkpoint.
+
+    Each label change costs a single line write, instead of dumping the whole dataset.
+    `compact` dumps the dataset to the checkpoint and empties the journal, and `replay`
+    applies the journal to a dataset loaded from the checkpoint. Records are identified by
+    their transaction id (`Record.id`), so that replaying survives new transactions or a
+    different row order.
+
+    Args:
+        checkpoint: Parquet dump of the dataset
+        compact_every: Number of journal entries after which `should_compact` is true
+    """
+
+    def __init__(self, checkpoint: Path | str, compact_every: int = 1000) -> None:
+        self.checkpoint = Path(checkpoint)
+        self.path = self.checkpoint.with_suffix(JOURNAL_SUFFIX)
+        self.compact_every = compact_every
+        self.n_entries = 0
+        self._file: IO[str] | None = None
+
+    @property
+    def should_compact(self) -> bool:
+        return self.n_entries >= self.compact_every
+
+    def append(self, transaction_id: int, label: str | None) -> None:
+        """Record the label of a record, flushed right away so that it survives a crash."""
+        if self._file is None:
+            self._file = self.path.open("a", encoding="utf-8")
+        entry = {"id": transaction_id, "label": label, "timestamp": time()}
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        self.n_entries += 1
+
+    def replay(self, dataset: Dataset) -> int:
+        """Apply the journal to a dataset loaded from the checkpoint, return its length.
+
+        A truncated last line, left by a crash while writing it, is cut off the file, so
+        that entries appended afterwards start on a line of their own.
+
+        Raises:
+            ValueError: If entries label transactions missing from the dataset
+        """
+        if not self.path.exists():
+            return 0
+        entries = []
+        end = 0
+        with self.path.open("rb") as journal:
+            for line in journal:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                end += len(line)
+        if end < self.path.stat().st_size:
+            os.truncate(self.path, end)
+        ids = np.array([entry["id"] for entry in entries], dtype=np.uint64)
+        positions = dataset.features.index.get_indexer(ids)
+        if (positions < 0).any():
+            raise ValueError(
+                f"{int((positions < 0).sum())} entries of {self.path} label transactions "
+                "missing from the dataset"
+            )
+        for position, entry in zip(positions.tolist(), entries):
+            dataset.set_label(position, entry["label"])
+        self.n_entries = len(entries)
+        return len(entries)
+
+    def compact(self, dataset: Dataset) -> None:
+        """Dump the dataset to the checkpoint and empty the journal."""
+        tmp_path = self.checkpoint.with_suffix(".tmp")
+        dataset.dump(tmp_path)
+        os.replace(tmp_path, self.checkpoint)
+        # Replaying entries already in the checkpoint is harmless, should this not happen
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self.n_entries = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
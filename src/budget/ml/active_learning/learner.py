@@ -4,10 +4,12 @@ from typing import Optional
 import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
-from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
 from sklearn.pipeline import Pipeline
 from lightgbm import LGBMClassifier
 
+from budget.ml.active_learning.grouping import DescriptionGroups, Propagation
+from budget.ml.active_learning.journal import LabelJournal
 from budget.ml.active_learning.models import Dataset
 from budget.ml.active_learning.strategies import Strategy
 
@@ -46,6 +48,10 @@ class ActiveLearner:
         self,
         labels: type[StrEnum],
         save_path: Optional[str] = None,
+        batch_size: int = 1,
+        groups: Optional[DescriptionGroups] = None,
+        propagation: Propagation = Propagation.NEVER,
+        journal: Optional[LabelJournal] = None,
     ) -> None:
         from budget.ml.active_learning.tui import launch_labeling_tui
 
@@ -54,13 +60,56 @@ class ActiveLearner:
             labels=labels,
             strategy=self.strategy,
             save_path=save_path,
+            batch_size=batch_size,
+            groups=groups,
+            propagation=propagation,
+            journal=journal,
         )
 
     def set_strategy(self, strategy: Strategy) -> None:
         self.strategy = strategy
 
 
-def get_default_model():
+class Vectorizer(StrEnum):
+    """How descriptions and bank categories are turned into character n-gram counts.
+
+    ``count`` learns a vocabulary of the most frequent n-grams when fitted, ``hashing``
+    hashes n-grams into a fixed number of columns: it's stateless, so transforming a
+    chunk of records doesn't depend on the others.
+    """
+
+    COUNT = "count"
+    HASHING = "hashing"
+
+
+def get_vectorizer(vectorizer: Vectorizer, n_features: int):
+    if vectorizer == Vectorizer.HASHING:
+        return HashingVectorizer(
+            n_features=n_features,
+            lowercase=True,
+            analyzer="char_wb",
+            ngram_range=(3, 5),
+            alternate_sign=False,
+            norm=None,
+        )
+    return CountVectorizer(
+        max_features=n_features,
+        lowercase=True,
+        analyzer="char_wb",
+        ngram_range=(3, 5),
+    )
+
+
+def get_default_model(vectorizer: Vectorizer = Vectorizer.COUNT, n_features: int | None = None):
+    """Default labeling pipeline.
+
+    Args:
+        vectorizer: How to vectorize descriptions and bank categories
+        n_features: Number of columns for descriptions, a third of it for each bank
+            category. Defaults to 3000 with ``count`` and 4096 with ``hashing``.
+    """
+    if n_features is None:
+        n_features = 4096 if vectorizer == Vectorizer.HASHING else 3000
     preprocessor = ColumnTransformer(
         transformers=[
             (
@@ -70,32 +119,17 @@ def get_default_model():
             ),
             (
                 "description_vec",
-                CountVectorizer(
-                    max_features=3000,
-                    lowercase=True,
-                    analyzer="char_wb",
-                    ngram_range=(3, 5),
-                ),
+                get_vectorizer(vectorizer, n_features),
                 "description",
             ),
             (
                 "category_vec",
-                CountVectorizer(
-                    max_features=1000,
-                    lowercase=True,
-                    analyzer="char_wb",
-                    ngram_range=(3, 5),
-                ),
+                get_vectorizer(vectorizer, n_features // 3),
                 "category",
             ),
             (
                 "subcategory_vec",
-                CountVectorizer(
-                    max_features=1000,
-                    lowercase=True,
-                    analyzer="char_wb",
-                    ngram_range=(3, 5),
-                ),
+                get_vectorizer(vectorizer, n_features // 3),
                 "subcategory",
             ),
             (
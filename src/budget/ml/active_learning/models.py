@@ -1,40 +1,192 @@
-from dataclasses import dataclass
+import copy
+from collections import Counter
 from pathlib import Path
-from typing import Any, Iterator, Self
+from typing import Any, Self
 
+import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
 from pandas import DataFrame
 
+from budget.profiling import DATASET_CONVERSION, PROFILER, SAVE
+
 LABEL_COLNAME = "__label__"
+# Index of the features of a dataset, as set by
+# `budget.transaction_loader.base.index_by_transaction_id`
+TRANSACTION_ID_COLNAME = "transaction_id"
+
+
+def _readonly(array: NDArray) -> NDArray:
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _index_by_position(features: DataFrame) -> DataFrame:
+    """Features indexed by their position, unless they're indexed by transaction id."""
+    if features.index.name == TRANSACTION_ID_COLNAME:
+        return features
+    return features.set_axis(pd.RangeIndex(len(features), name=TRANSACTION_ID_COLNAME))
 
 
-@dataclass
 class Record:
-    data: Any
-    label: str | None = None
+    """Lightweight view on a row of a dataset."""
+
+    __slots__ = ("dataset", "index")
+
+    def __init__(self, dataset: "Dataset", index: int) -> None:
+        self.dataset = dataset
+        self.index = index
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return self.dataset.features.iloc[self.index].to_dict()
+
+    @property
+    def id(self) -> int:
+        """Transaction id of the record, its position unless the features were indexed by one."""
+        return int(self.dataset.features.index[self.index])
+
+    @property
+    def label(self) -> str | None:
+        return self.dataset.labels[self.index]
 
     def label_as(self, label: str) -> None:
-        self.label = label
+        self.dataset.set_label(self.index, label)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Record):
+            return NotImplemented
+        return self.dataset is other.dataset and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.dataset), self.index))
+
+    def __repr__(self) -> str:
+        return f"Record(index={self.index}, data={self.data}, label={self.label!r})"
 
 
-@dataclass
 class Dataset:
-    records: list[Record]
+    """Columnar dataset: features are kept in a DataFrame and labels in an object array.
+
+    Unlabeled records have a ``None`` label. Records are positional views on both, and
+    features are indexed by transaction id (`TRANSACTION_ID_COLNAME`), which dumps keep.
+    Features that aren't already indexed by it, e.g. transactions that weren't passed
+    through `budget.transaction_loader.base.index_by_transaction_id`, are indexed by
+    position. Labels
+    must be set through `set_label` (or `Record.label_as`), which keeps the labeled masks,
+    indices and per-label counts up to date so that none of them needs a scan. `version` is
+    incremented on every label change.
+
+    A `snapshot` can be read from another thread while labels keep changing. Its `origin`
+    is the dataset it was taken from, so that caches keyed on a dataset are shared by its
+    snapshots.
+    """
+
+    def __init__(self, features: DataFrame, labels: NDArray[np.object_] | None = None) -> None:
+        labels = np.full(len(features), None, dtype=object) if labels is None else labels
+        if len(labels) != len(features):
+            raise ValueError(f"Got {len(labels)} labels for {len(features)} records")
+        self.features = _index_by_position(features)
+        self._labels = labels
+        self._labeled_mask = pd.notna(labels)
+        self._unlabeled_mask = ~self._labeled_mask
+        self._labeled = set(np.flatnonzero(self._labeled_mask).tolist())
+        self._label_counts = Counter(labels[self._labeled_mask].tolist())
+        self.version = 0
+        self.origin = self
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __getitem__(self, index: int) -> Record:
+        if not -len(self) <= index < len(self):
+            raise IndexError(f"Record index {index} out of range")
+        return Record(self, index % len(self))
+
+    @property
+    def records(self) -> list[Record]:
+        return [Record(self, index) for index in range(len(self))]
+
+    @property
+    def labels(self) -> NDArray[np.object_]:
+        return _readonly(self._labels)
+
+    @property
+    def n_labeled(self) -> int:
+        return len(self._labeled)
+
+    @property
+    def n_unlabeled(self) -> int:
+        return len(self) - len(self._labeled)
+
+    @property
+    def label_counts(self) -> dict[str, int]:
+        return dict(self._label_counts)
+
+    def set_label(self, index: int, label: str | None) -> None:
+        # Negative positions would be counted apart from the same positive ones
+        index = range(len(self))[index]
+        previous = self._labels[index]
+        if previous is not None:
+            self._label_counts[previous] -= 1
+            if not self._label_counts[previous]:
+                del self._label_counts[previous]
+        if label is not None:
+            self._label_counts[label] += 1
+            self._labeled.add(index)
+        else:
+            self._labeled.discard(index)
+        self._labels[index] = label
+        self._labeled_mask[index] = label is not None
+        self._unlabeled_mask[index] = label is None
+        self.version += 1
+
+    def get_labeled(self) -> NDArray[np.bool_]:
+        return _readonly(self._labeled_mask)
+
+    def get_unlabeled(self) -> NDArray[np.bool_]:
+        return _readonly(self._unlabeled_mask)
+
+    def labeled_indices(self) -> NDArray[np.intp]:
+        """Sorted positions of the labeled records, without scanning the dataset."""
+        return np.array(sorted(self._labeled), dtype=np.intp)
+
+    def snapshot(self) -> Self:
+        """Copy of the labels at their current version, sharing the features."""
+        snapshot = copy.copy(self)
+        snapshot._labels = self._labels.copy()
+        snapshot._labeled_mask = self._labeled_mask.copy()
+        snapshot._unlabeled_mask = self._unlabeled_mask.copy()
+        snapshot._labeled = set(self._labeled)
+        snapshot._label_counts = Counter(self._label_counts)
+        return snapshot
 
-    def get_labeled(self) -> Iterator[Record]:
-        return filter(lambda record: record.label is not None, self.records)
+    def to_dataframe(self, rows: NDArray | None = None) -> DataFrame:
+        """Features and labels, optionally restricted to a boolean mask or positions."""
+        with PROFILER.phase(DATASET_CONVERSION):
+            if rows is None:
+                return self.features.assign(**{LABEL_COLNAME: self._labels})
+            return self.features.iloc[rows].assign(**{LABEL_COLNAME: self._labels[rows]})
 
-    def get_unlabeled(self) -> Iterator[Record]:
-        return filter(lambda record: record.label is None, self.records)
+    def merge(self, transactions: DataFrame) -> Self:
+        """Dataset extended with the transactions it doesn't have yet, labels kept.
 
-    def to_dataframe(self) -> DataFrame:
-        df = DataFrame.from_records([record.data for record in self.records])
-        df = df.assign(**{LABEL_COLNAME: [record.label for record in self.records]})
-        return df
+        Transactions are matched on the transaction id index with a hash join, so
+        re-importing an export that overlaps the dataset takes linear time. Records keep
+        their position, new transactions are appended in their order.
+        """
+        if transactions.index.name != TRANSACTION_ID_COLNAME:
+            raise ValueError(f"Transactions to merge must be indexed by {TRANSACTION_ID_COLNAME!r}")
+        is_new = ~transactions.index.isin(self.features.index)
+        features = pd.concat([self.features, transactions[is_new]])
+        labels = np.concatenate([self._labels, np.full(is_new.sum(), None, dtype=object)])
+        return type(self)(features=features, labels=labels)
 
     def dump(self, path: Path | str) -> None:
         df = self.to_dataframe()
-        df.to_parquet(path)
+        with PROFILER.phase(SAVE):
+            df.to_parquet(path)
 
     @classmethod
     def from_file(cls, path: Path) -> Self:
@@ -43,10 +195,9 @@ class Dataset:
 
     @classmethod
     def from_dataframe(cls, df: DataFrame) -> Self:
-        records = df.to_dict(orient="records")
-        dataset = cls(
-            records=[
-                Record(data=record, label=record.pop(LABEL_COLNAME, None)) for record in records
-            ]
-        )
-        return dataset
+        with PROFILER.phase(DATASET_CONVERSION):
+            if LABEL_COLNAME not in df.columns:
+                return cls(features=df)
+            labels = df[LABEL_COLNAME].to_numpy(dtype=object, copy=True)
+            labels[pd.isna(labels)] = None
+            return cls(features=df.drop(columns=LABEL_COLNAME), labels=labels)
@@ -0,0 +1,223 @@
+"""Bulk labeling of a checkpoint with a fitted pipeline, streamed in batches."""
+
+import os
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from enum import StrEnum
+from pathlib import Path
+from typing import Any, Self
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from numpy.typing import NDArray
+from sklearn.pipeline import Pipeline
+
+from budget.ml.active_learning.models import LABEL_COLNAME
+
+PREDICTED_LABEL_COLNAME = "predicted_label"
+CONFIDENCE_COLNAME = "confidence"
+DEFAULT_BATCH_SIZE = 100_000
+DEFAULT_CHUNK_SIZE = 20_000
+
+# Model of the worker processes of a ChunkedPredictor, sent once per pool
+_worker_model: Any = None
+
+
+class Backend(StrEnum):
+    THREAD = "thread"
+    PROCESS = "process"
+
+
+def _set_worker_model(model: Any) -> None:
+    global _worker_model
+    _set_n_jobs(model, 1)
+    _worker_model = model
+
+
+def _set_n_jobs(model: Any, n_jobs: int | None) -> int | None:
+    """Set the number of threads of the estimator of ``model``, if any, return the previous one."""
+    estimator = model[-1] if isinstance(model, Pipeline) else model
+    if not hasattr(estimator, "n_jobs"):
+        return None
+    previous = estimator.n_jobs
+    estimator.set_params(n_jobs=n_jobs)
+    return previous
+
+
+@contextmanager
+def _single_threaded(model: Any) -> Iterator[None]:
+    """Predict with one thread per worker, instead of one per core each (e.g. LightGBM's OpenMP)."""
+    n_jobs = _set_n_jobs(model, 1)
+    try:
+        yield
+    finally:
+        _set_n_jobs(model, n_jobs)
+
+
+def _predict_proba(X: Any) -> NDArray:
+    return _worker_model.predict_proba(X)
+
+
+class ChunkedPredictor:
+    """Predict probabilities by fixed-size chunks spread over a pool of workers.
+
+    Each chunk is written into a preallocated output as soon as it's predicted, rather
+    than concatenating the predictions of all chunks at the end.
+
+    Threads suit models working on cached features: LightGBM releases the GIL while
+    predicting. Processes suit whole pipelines, whose vectorizers hold it. Either way, the
+    estimator predicts with a single thread per worker (``n_jobs=1``), rather than each
+    worker starting an OpenMP thread per core.
+
+    The pool of workers is started on the first parallel prediction and reused until
+    `close`, which the context manager calls on exit. Worker processes get a copy of the
+    model when the pool starts: predicting with another model starts a new pool, and a
+    model fitted again in place requires calling `model_changed` first.
+
+    Args:
+        chunk_size: Number of rows predicted at once by a worker
+        n_jobs: Number of workers, defaults to the number of cores
+        backend: Whether workers are threads or processes
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        n_jobs: int | None = None,
+        backend: Backend = Backend.THREAD,
+    ) -> None:
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.backend = Backend(backend)
+        self._executor: Executor | None = None
+        self._executor_model: Any = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def get_executor(self, model: Any) -> Executor:
+        """Pool of workers, started once and reused by later predictions."""
+        if self.backend == Backend.PROCESS and self._executor_model is not model:
+            self.close()
+        if self._executor is None:
+            if self.backend == Backend.PROCESS:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.n_jobs, initializer=_set_worker_model, initargs=(model,)
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+            self._executor_model = model
+        return self._executor
+
+    def model_changed(self) -> None:
+        """Stop worker processes holding a copy of a model that was fitted again since."""
+        if self.backend == Backend.PROCESS:
+            self.close()
+
+    def close(self) -> None:
+        """Shut the pool of workers down, if started."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+            self._executor_model = None
+
+    def predict_proba(self, model: Any, X: Any) -> NDArray:
+        """Probabilities of each class of ``model`` for the rows of a DataFrame or matrix."""
+        n_rows = X.shape[0]
+        out = np.empty((n_rows, len(model.classes_)))
+        starts = range(0, n_rows, self.chunk_size)
+        chunks = [_slice(X, start, start + self.chunk_size) for start in starts]
+        if self.n_jobs == 1 or len(chunks) <= 1:
+            for start, chunk in zip(starts, chunks):
+                out[start : start + self.chunk_size] = model.predict_proba(chunk)
+            return out
+
+        # Processes get the model once, when the pool starts
+        if self.backend == Backend.PROCESS:
+            predict, threads = _predict_proba, nullcontext()
+        else:
+            predict, threads = model.predict_proba, _single_threaded(model)
+        executor = self.get_executor(model)
+        with threads:
+            futures = {
+                executor.submit(predict, chunk): start for start, chunk in zip(starts, chunks)
+            }
+            for future in as_completed(futures):
+                start = futures.pop(future)
+                out[start : start + self.chunk_size] = future.result()
+        return out
+
+
+def _slice(X: Any, start: int, stop: int) -> Any:
+    return X.iloc[start:stop] if isinstance(X, pd.DataFrame) else X[start:stop]
+
+
+def read_labeled(path: Path | str) -> pd.DataFrame:
+    """Labeled rows of a checkpoint, without loading the unlabeled ones."""
+    dataset = ds.dataset(path, format="parquet")
+    table = dataset.to_table(filter=ds.field(LABEL_COLNAME).is_valid())
+    return table.to_pandas()
+
+
+def predict_labels(
+    model: Any, features: pd.DataFrame, predictor: ChunkedPredictor | None = None
+) -> tuple[NDArray, NDArray]:
+    """Most likely label of each row and its probability."""
+    if predictor is None:
+        proba = model.predict_proba(features)
+    else:
+        proba = predictor.predict_proba(model, features)
+    best = proba.argmax(axis=1)
+    return model.classes_[best], proba[np.arange(len(proba)), best]
+
+
+def predict_file(
+    model: Any,
+    source: Path | str,
+    output: Path | str,
+    threshold: float = 0.9,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    predictor: ChunkedPredictor | None = None,
+) -> tuple[int, int]:
+    """Predict labels of the unlabeled rows of a checkpoint, batch by batch.
+
+    Rows are written to ``output`` in the layout of the checkpoint, along with the
+    predicted label, when its probability reaches ``threshold``, and that probability. Already labeled rows aren't predicted.
+    Only one batch of rows is held in memory at a time, which ``predictor`` may split
+    into chunks predicted in parallel.
+
+    Returns:
+        Number of rows labeled by the model, and number of unlabeled rows
+    """
+    source_file = pq.ParquetFile(source)
+    # The pandas metadata of the checkpoint is kept, so that its transaction id column is
+    # read back as the index, as with `Dataset.from_file`
+    schema = source_file.schema_arrow
+    schema = schema.append(pa.field(PREDICTED_LABEL_COLNAME, pa.string()))
+    schema = schema.append(pa.field(CONFIDENCE_COLNAME, pa.float64()))
+
+    n_predicted, n_unlabeled = 0, 0
+    with pq.ParquetWriter(output, schema) as writer:
+        for batch in source_file.iter_batches(batch_size=batch_size):
+            df = batch.to_pandas()
+            unlabeled = df[LABEL_COLNAME].isna().to_numpy()
+            predicted = np.full(len(df), None, dtype=object)
+            confidence = np.full(len(df), np.nan)
+            if unlabeled.any():
+                labels, probabilities = predict_labels(model, df[unlabeled], predictor)
+                confident = probabilities >= threshold
+                predicted[np.flatnonzero(unlabeled)[confident]] = labels[confident]
+                confidence[unlabeled] = probabilities
+                n_predicted += int(confident.sum())
+                n_unlabeled += len(labels)
+            df[PREDICTED_LABEL_COLNAME] = predicted
+            df[CONFIDENCE_COLNAME] = confidence
+            writer.write_table(pa.Table.from_pandas(df, schema=schema))
+    return n_predicted, n_unlabeled
@@ -0,0 +1,155 @@
+"""Uncertainty scores computed from predicted probabilities, higher meaning more ambiguous.
+
+Scorers work in place: they overwrite the ``proba`` array they're given (a fresh output
+of ``predict_proba``) instead of allocating temporaries of the same size. To keep the
+probabilities, `Uncertainty.score` copies them by chunks of `KEEP_CHUNK_SIZE` rows.
+"""
+
+from enum import StrEnum
+from heapq import heapify, heappush, heapreplace
+
+from numpy.typing import NDArray
+from scipy.special import entr
+import numpy as np
+
+KEEP_CHUNK_SIZE = 65_536
+
+
+def least_confidence(proba: NDArray, out: NDArray | None = None) -> NDArray:
+    """One minus the probability of the most likely label."""
+    out = np.max(proba, axis=1, out=out)
+    return np.subtract(1, out, out=out)
+
+
+def margin(proba: NDArray, out: NDArray | None = None) -> NDArray:
+    """One minus the gap between the two most likely labels.
+
+    Rows are partially sorted in place so that the two largest probabilities end up in
+    the last two columns, without sorting the other ones.
+    """
+    n_classes = proba.shape[1]
+    if n_classes < 2:
+        return least_confidence(proba, out=out)
+    proba.partition(n_classes - 2, axis=1)
+    out = np.subtract(proba[:, -1], proba[:, -2], out=out)
+    return np.subtract(1, out, out=out)
+
+
+def entropy(proba: NDArray, out: NDArray | None = None) -> NDArray:
+    """Shannon entropy of the predicted distribution."""
+    entr(proba, out=proba)
+    return np.sum(proba, axis=1, out=out)
+
+
+class Uncertainty(StrEnum):
+    LEAST_CONFIDENCE = "least-confidence"
+    MARGIN = "margin"
+    ENTROPY = "entropy"
+
+    def score(self, proba: NDArray, out: NDArray | None = None, keep: bool = False) -> NDArray:
+        """Uncertainty of each row of ``proba``, which is overwritten unless ``keep``."""
+        if not keep:
+            return SCORERS[self](proba, out=out)
+        out = np.empty(len(proba)) if out is None else out
+        for start in range(0, len(proba), KEEP_CHUNK_SIZE):
+            chunk = slice(start, start + KEEP_CHUNK_SIZE)
+            SCORERS[self](proba[chunk].copy(), out=out[chunk])
+        return out
+
+
+SCORERS = {
+    Uncertainty.LEAST_CONFIDENCE: least_confidence,
+    Uncertainty.MARGIN: margin,
+    Uncertainty.ENTROPY: entropy,
+}
+
+
+def select_most_uncertain(scores: NDArray, k: int) -> NDArray[np.intp]:
+    """Indices of the ``k`` highest scores, highest first, ties broken by index."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    selected = np.argpartition(-scores, k)[:k]
+    selected.sort()
+    return selected[np.argsort(-scores[selected], kind="stable")]
+
+
+class CandidateHeap:
+    """The ``capacity`` most uncertain records, updatable from a partial rescoring.
+
+    Scores of every record are kept in ``scores`` (``-inf`` when a record isn't a
+    candidate) and the best ones in a min-heap, along with ``floor``, an upper bound of
+    the scores of records left out of it. Rescoring some records only pushes the ones
+    beating the worst entry, and entries are only trusted while they're above ``floor``:
+    the heap is topped up from ``scores`` below ``floor`` when fewer than the requested
+    number of them are, so ``capacity`` should leave some slack above that number.
+    """
+
+    def __init__(self, size: int, capacity: int = 100) -> None:
+        self.scores = np.full(size, -np.inf)
+        self.capacity = capacity
+        self.floor = -np.inf
+        self.heap: list[tuple[float, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def update(self, positions: NDArray[np.intp], scores: NDArray) -> None:
+        """Set the scores of some records and push the ones deserving a heap entry."""
+        self.scores[positions] = scores
+        self._drop(positions)
+        for i in select_most_uncertain(scores, self.capacity + 1):
+            entry = (float(scores[i]), int(positions[i]))
+            if len(self.heap) < self.capacity:
+                heappush(self.heap, entry)
+            elif entry > self.heap[0]:
+                self.floor = max(self.floor, heapreplace(self.heap, entry)[0])
+            else:
+                self.floor = max(self.floor, entry[0])
+                break
+
+    def discard(self, positions: NDArray[np.intp]) -> None:
+        """Records that are no longer candidates, e.g. labeled ones."""
+        self.scores[positions] = -np.inf
+        self._drop(positions)
+
+    def refill(self) -> None:
+        """Top the heap up to ``capacity`` with the best records scored at most ``floor``.
+
+        Entries above ``floor`` are kept as they are, only the records that may beat the
+        untrusted ones are selected from ``scores``.
+        """
+        trusted = [entry for entry in self.heap if entry[0] >= self.floor]
+        below = self.scores <= self.floor
+        below[np.fromiter((i for _, i in trusted), dtype=np.intp, count=len(trusted))] = False
+        candidates = np.flatnonzero(below & np.isfinite(self.scores))
+        missing = self.capacity - len(trusted)
+        selected = candidates[select_most_uncertain(self.scores[candidates], missing + 1)]
+        self.floor = self.scores[selected[-1]] if len(selected) > missing else -np.inf
+        self.heap = trusted + [(float(self.scores[i]), int(i)) for i in selected[:missing]]
+        heapify(self.heap)
+
+    def best(self, k: int | None = None) -> NDArray[np.intp]:
+        """Positions of the ``k`` most uncertain candidates, most uncertain first.
+
+        More than ``capacity`` candidates are selected from ``scores`` without growing the
+        heap.
+        """
+        k = self.capacity if k is None else k
+        if k > self.capacity:
+            selected = select_most_uncertain(self.scores, k)
+            return selected[np.isfinite(self.scores[selected])]
+        ranked = sorted(self.heap, key=lambda entry: (-entry[0], entry[1]))
+        trusted = [position for score, position in ranked if score >= self.floor]
+        if len(trusted) < k and self.floor > -np.inf:
+            self.refill()
+            return self.best(k)
+        return np.array(trusted[:k], dtype=np.intp)
+
+    def _drop(self, positions: NDArray[np.intp]) -> None:
+        if not self.heap:
+            return
+        members = np.fromiter((i for _, i in self.heap), dtype=np.intp, count=len(self.heap))
+        dropped = np.isin(members, positions)
+        if dropped.any():
+            self.heap = [entry for entry, drop in zip(self.heap, dropped) if not drop]
+            heapify(self.heap)
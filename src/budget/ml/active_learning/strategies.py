@@ -1,59 +1,444 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from random import choice
-from typing import Any
+from dataclasses import dataclass, replace
+from itertools import repeat
+from threading import RLock
+from time import monotonic, perf_counter
+from typing import Any, Collection
 
 from numpy.typing import NDArray
+from scipy.sparse import csr_matrix
+from sklearn.exceptions import NotFittedError
+from sklearn.pipeline import Pipeline
 import numpy as np
 
 from budget.ml.active_learning.exceptions import NoMoreUnlabeledRecord
+from budget.ml.active_learning.features import FeatureCache
+from budget.ml.active_learning.grouping import DescriptionGroups
 from budget.ml.active_learning.models import LABEL_COLNAME, Dataset, Record
+from budget.ml.active_learning.prediction import ChunkedPredictor
+from budget.ml.active_learning.scoring import CandidateHeap, Uncertainty, select_most_uncertain
+from budget.profiling import FIT, PREDICT_PROBA, PROFILER, RANKING
 
 
 @dataclass
 class Pick:
     record: Record
+    # Predicted probabilities of `labels`, the classes of the model
     scores: list[float] | None = None
+    labels: list[str] | None = None
+
+
+@dataclass
+class RefitPolicy:
+    """When and how `AmbiguousStrategy` refits its classifier while labels come in.
+
+    Attributes:
+        every: Refit once this many labels changed since the last fit
+        interval: Also refit once this many seconds passed since the last fit, if any
+            label changed in the meantime
+        warm_start_rounds: Add this many boosting rounds on top of the current LightGBM
+            booster instead of training from scratch. Only used with cached features, and
+            as long as no new label appeared.
+        max_warm_starts: Train from scratch after this many consecutive warm starts, which
+            bounds the size of the model
+    """
+
+    every: int = 1
+    interval: float | None = None
+    warm_start_rounds: int | None = None
+    max_warm_starts: int = 20
+
+
+@dataclass
+class CandidatePool:
+    """Which records `AmbiguousStrategy` scores again after refitting its classifier.
+
+    Instead of every unlabeled record, a pool of them is scored per round, rotating over
+    all unlabeled records in a random order. Other records keep their previous scores.
+
+    Attributes:
+        size: Number of records scored per round
+        stratified: Draw the pools evenly across the labels predicted by the last global
+            scoring, so that records of rare labels are scored as often as others
+        rescore_every: Score all unlabeled records again after this many rounds
+    """
+
+    size: int = 10_000
+    stratified: bool = False
+    rescore_every: int = 50
+
+
+# Candidates taken from the heap per diverse pick, before leaving out repeated descriptions
+DIVERSE_OVERFETCH = 4
+
+
+def dedupe_descriptions(
+    groups: DescriptionGroups, positions: NDArray[np.intp], limit: int
+) -> NDArray[np.intp]:
+    """Keep, in order, the first record of each description group, up to ``limit``."""
+    _, first = np.unique(groups.codes[positions], return_index=True)
+    first.sort()
+    return positions[first[:limit]]
+
+
+def _get_candidates(dataset: Dataset, exclude: Collection[int]) -> NDArray[np.intp]:
+    unlabeled = np.flatnonzero(dataset.get_unlabeled())
+    if not len(unlabeled):
+        raise NoMoreUnlabeledRecord("All dataset records has been labeled")
+    if exclude:
+        unlabeled = np.setdiff1d(unlabeled, list(exclude), assume_unique=True)
+    return unlabeled
 
 
 class Strategy(ABC):
+    # Groups of descriptions to pick diverse records from, computed from the dataset if None
+    groups: DescriptionGroups | None = None
+    _dataset_groups: tuple[Dataset, DescriptionGroups] | None = None
+
+    def pick(self, dataset: Dataset) -> Pick:
+        return self.pick_batch(dataset, k=1)[0]
+
     @abstractmethod
-    def pick(self, dataset: Dataset) -> Pick: ...
+    def pick_batch(self, dataset: Dataset, k: int, exclude: Collection[int] = ()) -> list[Pick]:
+        """Pick up to ``k`` records out of a single scoring round, best first.
+
+        Raises `NoMoreUnlabeledRecord` if every record is labeled.
+
+        Args:
+            dataset: The dataset to pick from
+            k: Number of records to pick
+            exclude: Positions of records that shouldn't be picked
+        """
+
+    def get_description_groups(self, dataset: Dataset) -> DescriptionGroups:
+        """``groups`` if given, otherwise the groups of the dataset, computed once for it."""
+        if self.groups is not None:
+            return self.groups
+        if self._dataset_groups is None or self._dataset_groups[0] is not dataset.origin:
+            self._dataset_groups = (dataset.origin, DescriptionGroups.from_dataset(dataset))
+        return self._dataset_groups[1]
+
+    def peek(self, dataset: Dataset, exclude: Collection[int] = ()) -> Pick | None:
+        """Cheap pick from what's already computed, ``None`` if nothing is available.
+
+        Args:
+            dataset: The dataset to pick from
+            exclude: Positions of records that shouldn't be picked
+        """
+        return None
 
 
 class RandomStrategy(Strategy):
-    def pick(self, dataset: Dataset) -> Pick:
-        unlabeled = [*dataset.get_unlabeled()]
-        if not unlabeled:
-            raise NoMoreUnlabeledRecord("All dataset records has been labeled")
+    """Pick unlabeled records at random.
 
-        return Pick(record=choice(unlabeled))
+    With ``diverse``, records of a batch have different normalized descriptions.
+    """
+
+    def __init__(self, diverse: bool = False) -> None:
+        self.diverse = diverse
+        self.rng = np.random.default_rng()
+
+    def pick_batch(self, dataset: Dataset, k: int, exclude: Collection[int] = ()) -> list[Pick]:
+        candidates = _get_candidates(dataset, exclude)
+        if self.diverse:
+            positions = dedupe_descriptions(
+                self.get_description_groups(dataset), self.rng.permutation(candidates), k
+            )
+        else:
+            positions = self.rng.choice(candidates, size=min(k, len(candidates)), replace=False)
+        return [Pick(record=dataset[int(position)]) for position in positions]
+
+    def peek(self, dataset: Dataset, exclude: Collection[int] = ()) -> Pick | None:
+        try:
+            picks = self.pick_batch(dataset, k=1, exclude=exclude)
+        except NoMoreUnlabeledRecord:
+            return None
+        return picks[0] if picks else None
 
 
 class AmbiguousStrategy(Strategy):
-    def __init__(self, model: Any, refit: bool = False) -> None:
+    """Pick the unlabeled record on which the model is the most uncertain.
+
+    ``uncertainty`` selects how predicted probabilities are scored, the margin between the
+    two most likely labels by default. Scores are kept in a `CandidateHeap` until the
+    model is fitted again: picking in between only discards newly labeled records. With a
+    ``pool``, fitting the model again only triggers the scoring of a `CandidatePool`.
+    With ``groups``, only one unlabeled record per group is scored and picked. With a
+    ``predictor``, records are scored by chunks spread over a pool of workers.
+
+    With ``cache_features`` and a `Pipeline` model, the dataset is transformed once by the
+    preprocessing steps and only the final classifier is fitted and applied to row slices
+    of the cached feature matrix.
+
+    ``refit`` is either a `RefitPolicy`, or ``True`` to refit after every label.
+
+    The ``lookahead`` most ambiguous records of the last scoring round are kept in
+    ``candidates``, which `peek` serves from while a new round is computed. With
+    ``diverse``, records sharing a normalized description with a more ambiguous one are
+    left out of the candidates, so that a batch doesn't repeat the same merchant.
+
+    To pick in a background thread while labels keep changing, pass a `Dataset.snapshot`
+    to `pick_batch` and `peek` with the live dataset: picks are mapped back to its records.
+    `fit` and `pick_batch` hold ``lock``, so that only one thread updates the model and
+    scores at a time.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        refit: bool | RefitPolicy = False,
+        cache_features: bool = True,
+        lookahead: int = 100,
+        diverse: bool = False,
+        uncertainty: Uncertainty = Uncertainty.MARGIN,
+        pool: CandidatePool | None = None,
+        groups: DescriptionGroups | None = None,
+        predictor: ChunkedPredictor | None = None,
+    ) -> None:
         self.model = model
-        self.refit = refit
+        self.lookahead = lookahead
+        self.diverse = diverse
+        self.uncertainty = Uncertainty(uncertainty)
+        self.candidates: list[Pick] = []
+        self.pool = pool
+        self.groups = groups
+        self.predictor = predictor
+        self.rng = np.random.default_rng()
+        self.rounds = 0
+        self.heap: CandidateHeap | None = None
+        # Probabilities and their labels, kept from scoring for the most uncertain records
+        self.proba: dict[int, tuple[NDArray, list[str]]] = {}
+        self._scored_dataset: Dataset | None = None
+        self._stale = False
+        self._pool_order = np.empty(0, dtype=np.intp)
+        self._pool_offset = 0
+        self.refit = RefitPolicy() if refit is True else refit or None
+        self.features: FeatureCache | None = None
+        if cache_features and isinstance(model, Pipeline):
+            self.features = FeatureCache(model[:-1])
+            self.classifier = model[-1]
+        self._fitted_dataset: Dataset | None = None
+        self._fitted_version = 0
+        self._fitted_at = 0.0
+        self.warm_starts = 0
+        self.lock = RLock()
+        self._ranking_time = 0.0
 
-    def pick(self, dataset: Dataset) -> Pick:
-        if self.refit:
-            training_dataset = Dataset(records=[*dataset.get_labeled()])
-            training_tx = training_dataset.to_dataframe()
-            self.model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
-        unlabeled = Dataset(records=[*dataset.get_unlabeled()])
-        if not unlabeled:
-            raise NoMoreUnlabeledRecord("All dataset records has been labeled")
-        X = unlabeled.to_dataframe().drop(LABEL_COLNAME, axis="columns")
-        preds = self.model.predict_proba(X)
-        gap = self.get_best_candidates_gap(preds)
-        most_ambiguous = gap.argmin()
-        return Pick(
-            record=unlabeled.records[most_ambiguous],
-            scores=preds[most_ambiguous].tolist(),
+    def needs_refit(self, dataset: Dataset) -> bool:
+        if self.refit is None:
+            return False
+        if self._fitted_dataset is not dataset.origin:
+            return True
+        changes = dataset.version - self._fitted_version
+        if changes >= self.refit.every:
+            return True
+        elapsed = monotonic() - self._fitted_at
+        return bool(changes) and self.refit.interval is not None and elapsed >= self.refit.interval
+
+    def fit(self, dataset: Dataset) -> None:
+        with self.lock:
+            version = dataset.version
+            labeled = dataset.labeled_indices()
+            if self.features is None:
+                training_tx = dataset.to_dataframe(labeled)
+                with PROFILER.phase(FIT):
+                    self.model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
+            else:
+                X = self.features.get(dataset)
+                with PROFILER.phase(FIT):
+                    self.fit_classifier(X[labeled], dataset.labels[labeled])
+            self.mark_fitted(dataset, version)
+
+    def mark_fitted(self, dataset: Dataset, version: int | None = None) -> None:
+        """Consider the model fitted on the labels of the dataset, e.g. once loaded from disk.
+
+        Args:
+            dataset: The dataset the model was fitted on
+            version: Version of the dataset when fitting started, defaults to the current one
+        """
+        self._fitted_dataset = dataset.origin
+        self._fitted_version = dataset.version if version is None else version
+        self._fitted_at = monotonic()
+        self._stale = True
+        if self.predictor is not None:
+            self.predictor.model_changed()
+
+    def is_fitted_on(self, dataset: Dataset) -> bool:
+        """Whether the model was fitted on the current labels of the dataset."""
+        return self._fitted_dataset is dataset.origin and self._fitted_version == dataset.version
+
+    def fit_classifier(self, X: csr_matrix, y: NDArray) -> None:
+        """Fit the classifier on cached features, warm starting it when the policy allows."""
+        rounds = self.refit and self.refit.warm_start_rounds
+        if not rounds or self.warm_starts >= self.refit.max_warm_starts:
+            self.warm_starts = 0
+            self.classifier.fit(X, y)
+            return
+        try:
+            booster = self.classifier.booster_
+            classes = self.classifier.classes_
+        except NotFittedError:
+            booster, classes = None, None
+        if booster is None or set(np.unique(y)) != set(classes):
+            self.warm_starts = 0
+            self.classifier.fit(X, y)
+            return
+
+        n_estimators = self.classifier.n_estimators
+        self.classifier.set_params(n_estimators=rounds)
+        try:
+            self.classifier.fit(X, y, init_model=booster)
+        finally:
+            self.classifier.set_params(n_estimators=n_estimators)
+        self.warm_starts += 1
+
+    def predict_proba(self, dataset: Dataset, rows: NDArray[np.intp]) -> NDArray:
+        if self.features is None:
+            model, X = self.model, dataset.features.iloc[rows]
+        else:
+            model, X = self.classifier, self.features.get(dataset)[rows]
+        with PROFILER.phase(PREDICT_PROBA):
+            if self.predictor is None:
+                return model.predict_proba(X)
+            return self.predictor.predict_proba(model, X)
+
+    def score(self, dataset: Dataset, rows: NDArray[np.intp]) -> None:
+        """Score all unlabeled ``rows`` of the dataset with the current model."""
+        # Slack above lookahead, so that labels don't send the heap back to the scores
+        self.heap = CandidateHeap(len(dataset), capacity=2 * self.lookahead)
+        self.proba = {}
+        self._scored_dataset = dataset.origin
+        self._stale = False
+        proba = self.predict_proba(dataset, rows)
+        if self.pool is not None:
+            strata = proba.argmax(axis=1) if self.pool.stratified else None
+            self._pool_order = self.get_pool_order(rows, strata)
+            self._pool_offset = 0
+            self.rounds = 0
+        self.update_scores(rows, proba)
+
+    def update_scores(self, rows: NDArray[np.intp], proba: NDArray) -> None:
+        """Push the scores of ``rows`` to the heap, keeping the probabilities of the best ones."""
+        start = perf_counter()
+        scores = self.uncertainty.score(proba, keep=True)
+        self.heap.update(rows, scores)
+        self._ranking_time += perf_counter() - start
+        if self.proba:
+            # Probabilities of rescored records are outdated
+            kept = np.fromiter(self.proba, dtype=np.intp, count=len(self.proba))
+            for position in kept[np.isin(kept, rows)].tolist():
+                del self.proba[position]
+        labels = self.model.classes_.tolist()
+        best = select_most_uncertain(scores, self.heap.capacity)
+        self.proba.update(zip(rows[best].tolist(), zip(proba[best], repeat(labels))))
+        if len(self.proba) > 2 * self.heap.capacity:
+            # Forget records that left the heap
+            kept = {position for _, position in self.heap.heap}
+            self.proba = {position: self.proba[position] for position in kept & self.proba.keys()}
+
+    def get_proba(
+        self, dataset: Dataset, rows: NDArray[np.intp]
+    ) -> list[tuple[NDArray, list[str]]]:
+        """Probabilities of ``rows`` and their labels, predicted only for rows not kept."""
+        missing = np.array([row for row in rows.tolist() if row not in self.proba], dtype=np.intp)
+        if len(missing):
+            labels = self.model.classes_.tolist()
+            predicted = self.predict_proba(dataset, missing)
+            self.proba.update(zip(missing.tolist(), zip(predicted, repeat(labels))))
+        return [self.proba[row] for row in rows.tolist()]
+
+    def score_pool(self, dataset: Dataset) -> None:
+        """Score the next pool of unlabeled records, keeping scores of the other ones."""
+        rows = np.take(
+            self._pool_order,
+            np.arange(self._pool_offset, self._pool_offset + self.pool.size),
+            mode="wrap",
         )
+        self._pool_offset = (self._pool_offset + self.pool.size) % len(self._pool_order)
+        rows = np.unique(rows[dataset.get_unlabeled()[rows]])
+        if len(rows):
+            self.update_scores(rows, self.predict_proba(dataset, rows))
+        self.rounds += 1
+        self._stale = False
+
+    def get_pool_order(self, rows: NDArray[np.intp], strata: NDArray | None) -> NDArray[np.intp]:
+        """Random order in which pools are drawn, going round-robin over ``strata`` if any."""
+        order = self.rng.permutation(len(rows))
+        if strata is not None:
+            strata = strata[order]
+            by_stratum = np.argsort(strata, kind="stable")
+            sorted_strata = strata[by_stratum]
+            starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+            counts = np.diff(np.r_[starts, len(strata)])
+            # Rank of each record within its stratum
+            rank = np.empty(len(strata), dtype=np.intp)
+            rank[by_stratum] = np.arange(len(strata)) - np.repeat(starts, counts)
+            order = order[np.argsort(rank, kind="stable")]
+        return rows[order]
+
+    def pick_batch(self, dataset: Dataset, k: int, exclude: Collection[int] = ()) -> list[Pick]:
+        with self.lock:
+            # Scoring and ranking are recorded as a single RANKING phase per pick
+            self._ranking_time = 0.0
+            if self.needs_refit(dataset):
+                self.fit(dataset)
+            unlabeled = _get_candidates(dataset, ())
+            if self.groups is not None:
+                unlabeled = self.groups.representatives(unlabeled)
+            if self.heap is None or self._scored_dataset is not dataset.origin:
+                self.score(dataset, unlabeled)
+            else:
+                self.heap.discard(dataset.labeled_indices())
+                if self._stale and (self.pool is None or self.rounds >= self.pool.rescore_every):
+                    self.score(dataset, unlabeled)
+                elif self._stale:
+                    self.score_pool(dataset)
+                unscored = unlabeled[np.isneginf(self.heap.scores[unlabeled])]
+                if len(unscored):
+                    # New representatives of groups whose representative was just labeled
+                    self.update_scores(unscored, self.predict_proba(dataset, unscored))
+            size = max(k, self.lookahead)
+            start = perf_counter()
+            ranking = self.rank(dataset, size, exclude)
+            if PROFILER.enabled:
+                PROFILER.record(RANKING, self._ranking_time + perf_counter() - start)
+            if not len(ranking):
+                return []
+            self.candidates = [
+                Pick(record=dataset[int(position)], scores=proba.tolist(), labels=labels)
+                for position, (proba, labels) in zip(ranking, self.get_proba(dataset, ranking))
+            ]
+            return self.candidates[:k]
+
+    def rank(self, dataset: Dataset, size: int, exclude: Collection[int]) -> NDArray[np.intp]:
+        """Positions of the ``size`` best candidates, most uncertain first.
+
+        With ``diverse``, `DIVERSE_OVERFETCH` times more candidates are taken from the heap
+        to leave out records sharing a description, and twice as many again as long as too
+        few descriptions are distinct.
+        """
+        factor = DIVERSE_OVERFETCH if self.diverse else 1
+        fetch = size * factor + len(exclude)
+        while True:
+            ranking = self.heap.best(fetch)
+            exhausted = len(ranking) < fetch
+            if exclude:
+                ranking = ranking[~np.isin(ranking, list(exclude))]
+            if self.diverse:
+                ranking = dedupe_descriptions(self.get_description_groups(dataset), ranking, size)
+            if len(ranking) >= size or exhausted:
+                return ranking[:size]
+            fetch *= 2
 
-    def get_best_candidates_gap(self, predictions: NDArray) -> NDArray:
-        top2_indices = np.argsort(predictions, axis=-1)[:, -2:]
-        top2 = np.take_along_axis(predictions, top2_indices, axis=-1)
-        gap = np.squeeze(np.diff(top2, axis=-1))
-        return gap
+    def peek(self, dataset: Dataset, exclude: Collection[int] = ()) -> Pick | None:
+        """Most ambiguous record of the last scoring round that is still unlabeled."""
+        labels = dataset.labels
+        for pick in self.candidates:
+            index = pick.record.index
+            if (
+                pick.record.dataset.origin is dataset.origin
+                and labels[index] is None
+                and index not in exclude
+            ):
+                return replace(pick, record=dataset[index])
+        return None
@@ -1,126 +1,177 @@
 """TUI application for interactive dataset labeling with vim-style keybindings."""
 
+from collections import deque
+from dataclasses import replace
 from enum import StrEnum
+from functools import partial
+from time import perf_counter
 from typing import List, Optional
 
 from textual.app import App, ComposeResult
 from textual.binding import Binding
 from textual.containers import Container, Vertical
 from textual.reactive import reactive
+from textual.widget import Widget
 from textual.widgets import Footer, Label, Static
+from textual.worker import Worker, WorkerState
 import numpy as np
 
 from budget.categories import Category
 from budget.ml.active_learning.exceptions import NoMoreUnlabeledRecord
+from budget.ml.active_learning.grouping import DescriptionGroups, Propagation
+from budget.ml.active_learning.journal import LabelJournal
 from budget.ml.active_learning.learner import ActiveLearner
 from budget.ml.active_learning.models import Dataset, Record
 from budget.ml.active_learning.strategies import Pick, Strategy
+from budget.profiling import PROFILER, TUI_RENDER
+
+# Latency from a key press to the display of the next record
+NEXT_RECORD = "next record"
 
 
 class RecordDisplay(Static):
-    """Widget to display the current record data."""
+    """Widget to display the current record data.
+
+    The markup of the record fields is built once per record, only the label line is
+    rendered again when the record gets labeled.
+    """
 
     def __init__(self, record: Optional[Record] = None) -> None:
         super().__init__()
         self.record = record
+        self._fields_markup = ""
+        self._content: Optional[str] = None
 
     def update_record(self, record: Record) -> None:
         """Update the displayed record."""
+        if record != self.record:
+            self._fields_markup = self.render_fields(record)
         self.record = record
         self.update_display()
 
+    @staticmethod
+    def render_fields(record: Record) -> str:
+        lines = ["[bold]Current Record[/bold]\n"]
+        if isinstance(record.data, dict):
+            lines.extend(f"[bold]{key}[/bold]: {value}" for key, value in record.data.items())
+        else:
+            lines.append(f"[bold]Data[/bold]: {record.data}")
+        return "\n".join(lines)
+
     def update_display(self) -> None:
         """Refresh the record display."""
         if not self.record:
-            self.update("No record to display")
+            self.show("No record to display")
             return
 
-        # Format record data in a readable way
-        content = "[bold]Current Record[/bold]\n\n"
-        if isinstance(self.record.data, dict):
-            for key, value in self.record.data.items():
-                content += f"[bold]{key}[/bold]: {value}\n"
-        else:
-            content += f"[bold]Data[/bold]: {self.record.data}\n"
-
         if self.record.label:
-            content += f"\n[bold]Current Label[/bold]: {self.record.label}"
+            status = f"[bold]Current Label[/bold]: {self.record.label}"
         else:
-            content += "\n[bold]Status[/bold]: Unlabeled"
+            status = "[bold]Status[/bold]: Unlabeled"
+        self.show(f"{self._fields_markup}\n\n{status}")
 
-        self.update(content)
+    def show(self, content: str) -> None:
+        """Display markup, unless it's already displayed."""
+        if content != self._content:
+            self._content = content
+            self.update(content)
 
 
-class StatsPanel(Static):
-    """Widget to display labeling statistics."""
+class StatsPanel(Widget):
+    """Widget to display labeling statistics.
+
+    It's rendered from its reactive attributes, so that changing several of them at once
+    repaints it once.
+    """
 
     labeled_count: reactive[int] = reactive(0)
     unlabeled_count: reactive[int] = reactive(0)
     total_count: reactive[int] = reactive(0)
+    model_status: reactive[str] = reactive("")
 
     def update_stats(self, dataset: Dataset) -> None:
         """Update statistics from dataset."""
-        labeled = list(dataset.get_labeled())
-        unlabeled = list(dataset.get_unlabeled())
-
-        self.labeled_count = len(labeled)
-        self.unlabeled_count = len(unlabeled)
-        self.total_count = len(dataset.records)
+        self.total_count = len(dataset)
+        self.labeled_count = dataset.n_labeled
+        self.unlabeled_count = dataset.n_unlabeled
 
-    def watch_labeled_count(self) -> None:
-        """React to changes in labeled count."""
-        self.update_display()
-
-    def watch_unlabeled_count(self) -> None:
-        """React to changes in unlabeled count."""
-        self.update_display()
-
-    def update_display(self) -> None:
-        """Update the stats display."""
+    def render(self) -> str:
         if self.total_count == 0:
             progress = 0
         else:
             progress = (self.labeled_count / self.total_count) * 100
 
-        content = f"""Progress
+        return f"""Progress
 
 Labeled: {self.labeled_count}
 Unlabeled: {self.unlabeled_count}
 Total:** {self.total_count}
-Progress: {progress:.1f}%"""
+Progress: {progress:.1f}%
+Model: {self.model_status}"""
 
-        self.update(content)
 
+class LabelRow(Widget):
+    """A label of the labels panel, with the score of the displayed record."""
 
-class LabelsPanel(Static):
-    """Widget to display all available labels with selection highlighting."""
+    DEFAULT_CSS = """
+    LabelRow {
+        height: 1;
+    }
+    """
+
+    selected: reactive[bool] = reactive(False)
+    score: reactive[Optional[float]] = reactive(None)
+
+    def __init__(self, position: int, label: str) -> None:
+        super().__init__()
+        self.prefix = f"{position + 1}. {label.upper()} "
+
+    def render(self) -> str:
+        score = f"({self.score:.2f}) " if self.score else ""
+        if self.selected:
+            return f"▶ [reverse]{self.prefix}{score}[/reverse]"
+        return f"  {self.prefix}{score}"
+
+
+class LabelsPanel(Widget):
+    """Widget to display all available labels with selection highlighting.
+
+    Each label is a row of its own: moving the selection repaints two rows, and showing
+    a pick repaints the rows whose score changed.
+    """
+
+    DEFAULT_CSS = """
+    LabelsPanel {
+        height: auto;
+    }
+    """
 
     selected_index: reactive[int] = reactive(0)
 
     def __init__(self, labels: List[str]) -> None:
         super().__init__()
         self.labels = labels
+        self.rows = [LabelRow(i, label) for i, label in enumerate(labels)]
 
-    def watch_selected_index(self) -> None:
-        """React to changes in selected index."""
-        self.update_display()
-
-    def update_display(self, pick: Pick | None = None) -> None:
-        """Update the labels display with highlighting."""
-        content = "[bold]Labels[/bold]\n\n"
-        scores = pick and pick.scores or [None] * len(self.labels)
+    def compose(self) -> ComposeResult:
+        yield Label("[bold]Labels[/bold]\n")
+        yield from self.rows
 
-        for i, (label, score) in enumerate(zip(self.labels, scores)):
-            prefix = "▶ " if i == self.selected_index else "  "
-            highlight = "[reverse]" if i == self.selected_index else ""
-            end_highlight = "[/reverse]" if i == self.selected_index else ""
-            start_score = "(" if score else ""
-            score = f"{score:.2f}" if score else ""
-            end_score = ")" if score else ""
+    def on_mount(self) -> None:
+        self.rows[self.selected_index].selected = True
 
-            content += f"{prefix}{highlight}{i + 1}. {label.upper()} {start_score}{score}{end_score} {end_highlight}\n"
+    def watch_selected_index(self, previous: int, index: int) -> None:
+        """Move the highlighting from the previously selected row."""
+        self.rows[previous].selected = False
+        self.rows[index].selected = True
 
-        self.update(content)
+    def update_display(self, pick: Pick | None = None) -> None:
+        """Show the scores of a pick next to their label."""
+        scores = {}
+        if pick is not None and pick.scores and pick.labels:
+            scores = dict(zip(pick.labels, pick.scores))
+        for label, row in zip(self.labels, self.rows):
+            row.score = scores.get(label)
 
     def set_selected_index(self, index: int) -> None:
         """Set the selected label index."""
@@ -128,6 +179,61 @@ class LabelsPanel(Static):
             self.selected_index = index
 
 
+class ProfilePanel(Static):
+    """Widget to display the latencies of the labeling loop, in milliseconds."""
+
+    def on_mount(self) -> None:
+        self.update_display()
+        self.set_interval(1.0, self.update_display)
+
+    def update_display(self) -> None:
+        lines = [f"[bold]Latency (ms)[/bold]\n\n{'':<18} {'p50':>7} {'p99':>7}"]
+        for name, stats in PROFILER.summary().items():
+            lines.append(f"{name:<18} {stats['p50'] * 1000:>7.1f} {stats['p99'] * 1000:>7.1f}")
+        self.update("\n".join(lines))
+
+
+class PickHistory:
+    """Bounded history of the displayed picks, to go back to them without scoring them again.
+
+    ``position`` counts the picks displayed after the one being browsed, 0 when the last
+    pick is displayed.
+    """
+
+    def __init__(self, size: int = 100) -> None:
+        self.picks: deque[Pick] = deque(maxlen=size)
+        self.position = 0
+
+    @property
+    def browsing(self) -> bool:
+        return self.position > 0
+
+    def push(self, pick: Pick, replace: bool = False) -> None:
+        """Remember a newly displayed pick, or refresh the scores of the last one.
+
+        Args:
+            pick: The displayed pick
+            replace: Whether the pick replaces the last one, that wasn't acted on
+        """
+        if self.picks and (replace or self.picks[-1].record == pick.record):
+            self.picks[-1] = pick
+        else:
+            self.picks.append(pick)
+        self.position = 0
+
+    def back(self) -> Optional[Pick]:
+        if self.position + 1 >= len(self.picks):
+            return None
+        self.position += 1
+        return self.picks[-1 - self.position]
+
+    def forward(self) -> Optional[Pick]:
+        if not self.position:
+            return None
+        self.position -= 1
+        return self.picks[-1 - self.position]
+
+
 class LabelingApp(App):
     """Main TUI application for dataset labeling."""
 
@@ -149,7 +255,7 @@ class LabelingApp(App):
     }
 
     #stats-panel {
-        height: 8;
+        height: 9;
         border: solid $accent;
         margin-bottom: 1;
         padding: 1;
@@ -160,6 +266,12 @@ class LabelingApp(App):
         padding: 1;
         margin-bottom: 1;
     }
+
+    #profile-panel {
+        height: auto;
+        border: solid $accent;
+        padding: 1;
+    }
     """
 
     BINDINGS = [
@@ -171,6 +283,7 @@ class LabelingApp(App):
         # Labeling actions
         Binding("enter", "confirm_label", "Apply label", show=True),
         Binding("s", "skip_record", "Skip record", show=True),
+        Binding("y", "propagate_label", "Label similar records", show=True),
         # App controls
         Binding("q", "quit", "Quit", show=True),
         Binding("w", "save_dataset", "Save progress", show=True),
@@ -181,13 +294,35 @@ class LabelingApp(App):
         learner: ActiveLearner,
         labels: type[StrEnum],
         save_path: Optional[str] = None,
+        batch_size: int = 1,
+        groups: Optional[DescriptionGroups] = None,
+        propagation: Propagation = Propagation.NEVER,
+        journal: Optional[LabelJournal] = None,
+        history_size: int = 100,
     ):
         super().__init__()
         self.learner = learner
         self.labels = sorted([label.value for label in labels])
         self.save_path = save_path
+        self.batch_size = batch_size
+        self.groups = groups
+        self.propagation = propagation
+        self.journal = journal
+        # Labeled record whose label is waiting to be applied to its group
+        self.pending_propagation: Optional[int] = None
         self.current_pick: Optional[Pick] = None
+        self.history = PickHistory(history_size)
+        # Recently skipped records, not picked again until they fall out
+        self.skipped: deque[int] = deque(maxlen=history_size)
+        # Picks of the last scoring round, shown before scoring again
+        self.queue: deque[Pick] = deque()
+        self.current_is_stale = False
         self.selected_label_index = 0
+        # Scoring rounds run one at a time in a worker thread
+        self.scoring = False
+        self.rescore_pending = False
+        self.scoring_version = 0
+        self.scored_version: Optional[int] = None
 
     def compose(self) -> ComposeResult:
         """Create the TUI layout."""
@@ -211,48 +346,190 @@ class LabelingApp(App):
                     self.labels_panel = LabelsPanel(self.labels)
                     yield self.labels_panel
 
+                if PROFILER.enabled:
+                    with Container(id="profile-panel"):
+                        yield ProfilePanel()
+
         yield Footer()
 
     def on_mount(self) -> None:
         """Initialize the app when mounted."""
-        self.load_next_record()
-        self.labels_panel.update_display(self.current_pick)
         self.stats_panel.update_stats(self.learner.dataset)
+        self.load_next_record()
 
     def load_next_record(self) -> None:
-        """Load the next unlabeled record."""
-        try:
-            self.current_pick = self.learner.strategy.pick(self.learner.dataset)
-            self.record_display.update_record(self.current_pick.record)
-            if self.current_pick.scores:
-                index = int(np.argmax(self.current_pick.scores))
-                self.selected_label_index = index
-                self.labels_panel.set_selected_index(index)
-            self.labels_panel.update_display(self.current_pick)
-        except NoMoreUnlabeledRecord as e:
-            self.notify(f"No more unlabeled records: {e}")
+        """Show the next queued record, scoring a new batch once the queue is drained.
+
+        With an empty queue, the best record already available is shown until the new
+        batch comes in.
+        """
+        exclude = self.get_excluded()
+        pick = self.pop_queue(exclude)
+        self.current_is_stale = pick is None
+        if pick is None:
+            pick = self.learner.strategy.peek(self.learner.dataset, exclude=exclude)
+        self.show_pick(pick)
+        if not self.queue:
+            self.request_scoring()
+
+    def get_excluded(self) -> set[int]:
+        """Records not to pick next: the displayed one and the recently skipped ones."""
+        exclude = set(self.skipped)
+        if self.current_pick:
+            exclude.add(self.current_pick.record.index)
+        return exclude
+
+    def pop_queue(self, exclude: set[int]) -> Optional[Pick]:
+        """Next queued record that is still unlabeled, if any."""
+        while self.queue:
+            pick = self.queue.popleft()
+            if pick.record.label is None and pick.record.index not in exclude:
+                return pick
+        return None
+
+    def show_pick(self, pick: Optional[Pick], remember: bool = True, replace: bool = False) -> None:
+        """Display a pick, preselecting its most likely label.
+
+        Args:
+            pick: The pick to display, if any
+            remember: Whether to add the pick to the history, false when browsing it
+            replace: Whether the pick replaces the last one of the history
+        """
+        start = perf_counter()
+        self.current_pick = pick
+        if pick is None:
+            self.record_display.show("Scoring records...")
+            return
+        if remember:
+            self.history.push(pick, replace=replace)
+        self.record_display.update_record(pick.record)
+        # Records labeled already, when going back to them, show their label instead
+        selected_label = pick.record.label
+        if selected_label is None and pick.scores and pick.labels:
+            selected_label = pick.labels[int(np.argmax(pick.scores))]
+        if selected_label in self.labels:
+            self.selected_label_index = self.labels.index(selected_label)
+            self.labels_panel.set_selected_index(self.selected_label_index)
+        self.labels_panel.update_display(pick)
+        self.record_after_refresh(TUI_RENDER, start)
+
+    def record_after_refresh(self, phase: str, start: float) -> None:
+        """Record the latency of a phase once the screen shows its outcome."""
+        if PROFILER.enabled:
+            self.call_after_refresh(lambda: PROFILER.record(phase, perf_counter() - start))
+
+    def request_scoring(self) -> None:
+        """Start a scoring round, or schedule one if a round is already running."""
+        if self.scoring:
+            self.rescore_pending = True
+        else:
+            self.scoring = True
+            self.scoring_version = self.learner.dataset.version
+            exclude = frozenset(self.get_excluded())
+            # The worker reads a snapshot, labels keep changing in the meantime
+            self.run_worker(
+                partial(
+                    self.learner.strategy.pick_batch,
+                    self.learner.dataset.snapshot(),
+                    self.batch_size,
+                    exclude=exclude,
+                ),
+                group="scoring",
+                exit_on_error=False,
+                thread=True,
+            )
+        self.update_model_status()
+
+    def on_worker_state_changed(self, event: Worker.StateChanged) -> None:
+        """Queue the batch of a finished scoring round, picked from a snapshot of the dataset."""
+        if event.worker.group != "scoring" or not event.worker.is_finished:
+            return
+        self.scoring = False
+        if event.state == WorkerState.SUCCESS:
+            self.scored_version = self.scoring_version
+            current = self.current_pick and self.current_pick.record
+            dataset = self.learner.dataset
+            result = [
+                replace(pick, record=dataset[pick.record.index]) for pick in event.worker.result
+            ]
+            picks = []
+            for pick in result:
+                if pick.record == current:
+                    if not self.history.browsing:
+                        # Same record, only refresh its scores and keep the selected label
+                        self.current_pick = pick
+                        self.history.push(pick)
+                        self.labels_panel.update_display(pick)
+                elif pick.record.label is None:
+                    picks.append(pick)
+            self.queue = deque(picks)
+            if not result and self.skipped:
+                # Only skipped records are left, give them another chance
+                self.skipped.clear()
+                self.rescore_pending = True
+            elif (self.current_pick is None or self.current_is_stale) and not self.history.browsing:
+                # The displayed record came from a previous round, show the fresh batch
+                pick = self.pop_queue(exclude=set())
+                if pick is not None:
+                    self.current_is_stale = False
+                    self.show_pick(pick, replace=self.current_pick is not None)
+        elif isinstance(event.worker.error, NoMoreUnlabeledRecord):
+            self.notify(f"No more unlabeled records: {event.worker.error}")
             self.current_pick = None
-            self.record_display.update("All records have been processed!")
+            self.record_display.show("All records have been processed!")
+            self.rescore_pending = False
+        elif event.worker.error is not None:
+            self.notify(f"Scoring failed: {event.worker.error}", severity="error")
+
+        if self.rescore_pending:
+            self.rescore_pending = False
+            if not self.queue:
+                self.request_scoring()
+        self.update_model_status()
+
+    def update_model_status(self) -> None:
+        """Show how many label changes the displayed predictions are behind."""
+        if self.scored_version is None:
+            self.stats_panel.model_status = "scoring..."
+            return
+        behind = self.learner.dataset.version - self.scored_version
+        if not behind:
+            status = "up to date"
+        else:
+            status = f"{behind} label{'s' if behind > 1 else ''} behind"
+        if self.scoring:
+            status += ", scoring..."
+        self.stats_panel.model_status = status
 
     def action_next_label(self) -> None:
         """Move to next label (vim j)."""
         self.selected_label_index = (self.selected_label_index + 1) % len(self.labels)
         self.labels_panel.set_selected_index(self.selected_label_index)
-        self.labels_panel.update_display(self.current_pick)
 
     def action_prev_label(self) -> None:
         """Move to previous label (vim k)."""
         self.selected_label_index = (self.selected_label_index - 1) % len(self.labels)
         self.labels_panel.set_selected_index(self.selected_label_index)
-        self.labels_panel.update_display(self.current_pick)
 
     def action_next_record(self) -> None:
-        """Move to next record (vim l)."""
+        """Move to next record (vim l), skipping the current one if it's the last one."""
         self.action_skip_record()
 
     def action_prev_record(self) -> None:
-        """Move to previous record (vim h) - for now, just skip."""
-        self.notify("Previous record navigation not implemented", severity="warning")
+        """Move back to the previously displayed record (vim h), with its scores."""
+        pick = self.history.back()
+        if pick is None:
+            self.notify("No previous record", severity="warning")
+            return
+        self.show_pick(pick, remember=False)
+
+    def show_next_record(self) -> None:
+        """Move forward in the history when browsing it, else show the next record."""
+        pick = self.history.forward()
+        if pick is None:
+            self.load_next_record()
+        else:
+            self.show_pick(pick, remember=False)
 
     def action_confirm_label(self) -> None:
         """Apply the selected label to current record."""
@@ -260,20 +537,79 @@ class LabelingApp(App):
             self.notify("No record to label", severity="warning")
             return
 
+        start = perf_counter()
         selected_label = self.labels[self.selected_label_index]
         self.current_pick.record.label_as(selected_label)
+        self.journal_labels([self.current_pick.record.index])
+        self.offer_propagation(self.current_pick.record.index)
         self.stats_panel.update_stats(self.learner.dataset)
-        self.load_next_record()
+        self.update_model_status()
+        self.show_next_record()
+        self.record_after_refresh(NEXT_RECORD, start)
+
+    def offer_propagation(self, index: int) -> None:
+        """Apply the label of a record to its group, or ask to, depending on propagation."""
+        self.pending_propagation = None
+        if self.groups is None or self.propagation == Propagation.NEVER:
+            return
+        members = self.groups.members(index)
+        n_similar = int(self.learner.dataset.get_unlabeled()[members].sum())
+        if not n_similar:
+            return
+        label = self.learner.dataset.labels[index]
+        if self.propagation == Propagation.ALWAYS:
+            self.journal_labels(self.groups.propagate(self.learner.dataset, index))
+            self.notify(f"Labeled {n_similar} similar records as {label}")
+        else:
+            self.pending_propagation = index
+            self.notify(f"Press y to label {n_similar} similar records as {label}")
+
+    def action_propagate_label(self) -> None:
+        """Apply the last label to the records similar to the last labeled one."""
+        if self.pending_propagation is None:
+            self.notify("No label to apply to similar records", severity="warning")
+            return
+        index, self.pending_propagation = self.pending_propagation, None
+        labeled = self.groups.propagate(self.learner.dataset, index)
+        self.journal_labels(labeled)
+        self.notify(
+            f"Labeled {len(labeled)} similar records as {self.learner.dataset.labels[index]}"
+        )
+        self.stats_panel.update_stats(self.learner.dataset)
+        self.update_model_status()
+        if self.current_pick and self.current_pick.record.label is not None:
+            self.show_next_record()
+
+    def journal_labels(self, indices) -> None:
+        """Append new labels to the journal, folding it into the checkpoint once it's long."""
+        if self.journal is None:
+            return
+        dataset = self.learner.dataset
+        for index in indices:
+            record = dataset[int(index)]
+            self.journal.append(record.id, record.label)
+        if self.journal.should_compact:
+            self.action_save_dataset()
 
     def action_skip_record(self) -> None:
-        """Skip current record without labeling."""
-        self.load_next_record()
+        """Skip current record without labeling, it isn't picked again right away."""
+        start = perf_counter()
+        if self.history.browsing:
+            self.show_next_record()
+        else:
+            if self.current_pick:
+                self.skipped.append(self.current_pick.record.index)
+            self.load_next_record()
+        self.record_after_refresh(NEXT_RECORD, start)
 
     def action_save_dataset(self) -> None:
         """Save current progress."""
         if self.save_path:
             try:
-                self.learner.dataset.dump(self.save_path)
+                if self.journal is not None:
+                    self.journal.compact(self.learner.dataset)
+                else:
+                    self.learner.dataset.dump(self.save_path)
                 self.notify(f"Progress saved to {self.save_path}")
             except Exception as e:
                 self.notify(f"Failed to save: {e}", severity="error")
@@ -286,6 +622,10 @@ def launch_labeling_tui(
     labels: type[StrEnum] = Category,
     strategy: Strategy | None = None,
     save_path: Optional[str] = None,
+    batch_size: int = 1,
+    groups: Optional[DescriptionGroups] = None,
+    propagation: Propagation = Propagation.NEVER,
+    journal: Optional[LabelJournal] = None,
 ) -> None:
     """Launch the TUI labeling application.
 
@@ -294,6 +634,10 @@ def launch_labeling_tui(
         labels: List of available labels
         strategy_name: Active learning strategy to use
         save_path: Optional path to save progress
+        batch_size: Number of records to pick per scoring round
+        groups: Groups of similar records, to apply a label to
+        propagation: Whether to apply labels to similar records
+        journal: Journal to append labels to, compacted to the checkpoint when saving
     """
     from budget.ml.active_learning.strategies import RandomStrategy
     from budget.ml.active_learning.learner import ActiveLearner
@@ -302,5 +646,13 @@ def launch_labeling_tui(
 
     learner = ActiveLearner(dataset, _strategy)
 
-    app = LabelingApp(learner, labels, save_path)
+    app = LabelingApp(
+        learner,
+        labels,
+        save_path,
+        batch_size=batch_size,
+        groups=groups,
+        propagation=propagation,
+        journal=journal,
+    )
     app.run()
@@ -0,0 +1,143 @@
+"""Latency histograms of the phases of a labeling session.
+
+Phases are timed with ``PROFILER.phase(name)``, which does nothing until the profiler is
+enabled (``budget labeling launch-ui --profile``).
+"""
+
+import json
+import math
+from contextlib import nullcontext
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import ContextManager
+
+# Phases of the labeling loop
+LOADER_PARSE = "loader parse"
+DATASET_CONVERSION = "dataset conversion"
+FEATURE_TRANSFORM = "feature transform"
+FIT = "fit"
+PREDICT_PROBA = "predict_proba"
+RANKING = "uncertainty ranking"
+TUI_RENDER = "tui render"
+SAVE = "save"
+
+# Buckets are a quarter of an octave wide, from 1µs to 2^27µs (over 2 minutes)
+BUCKETS_PER_OCTAVE = 4
+N_BUCKETS = 27 * BUCKETS_PER_OCTAVE
+MIN_LATENCY = 1e-6
+PERCENTILES = [50, 90, 99]
+
+
+class Histogram:
+    """Log-scaled histogram of latencies, with constant memory and recording cost.
+
+    Percentiles are upper bounds of their bucket, so they're within 19% of the actual
+    latency.
+    """
+
+    def __init__(self) -> None:
+        self.counts = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def get_bucket(seconds: float) -> int:
+        if seconds <= MIN_LATENCY:
+            return 0
+        bucket = int(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_OCTAVE)
+        return min(bucket, N_BUCKETS - 1)
+
+    @staticmethod
+    def get_upper_bound(bucket: int) -> float:
+        return MIN_LATENCY * 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE)
+
+    def record(self, seconds: float) -> None:
+        self.counts[self.get_bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        """Latency under which ``q`` percent of the recorded ones are."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.get_upper_bound(bucket), self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            **{f"p{q}": self.percentile(q) for q in PERCENTILES},
+            "max": self.max,
+        }
+
+
+class _Timer:
+    __slots__ = ("name", "profiler", "start")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.profiler.record(self.name, perf_counter() - self.start)
+
+
+class Profiler:
+    """Latency histograms by phase, recorded from any thread."""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.histograms: dict[str, Histogram] = {}
+        self._lock = Lock()
+        self._disabled = nullcontext()
+
+    def phase(self, name: str) -> ContextManager[None]:
+        """Context manager timing a phase, when the profiler is enabled."""
+        if not self.enabled:
+            return self._disabled
+        return _Timer(self, name)
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.record(seconds)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count, total, mean, percentiles and max latency of each phase, in seconds."""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def format(self) -> str:
+        """Table of the phase latencies, in milliseconds."""
+        lines = [f"{'phase':<20} {'count':>6} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}"]
+        for name, stats in self.summary().items():
+            latencies = " ".join(
+                f"{stats[key] * 1000:>8.1f}" for key in ["p50", "p90", "p99", "max"]
+            )
+            lines.append(f"{name:<20} {stats['count']:>6} {latencies}")
+        return "\n".join(lines)
+
+    def dump(self, path: Path | str) -> None:
+        Path(path).write_text(json.dumps(self.summary(), indent=2))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms = {}
+
+
+PROFILER = Profiler()
@@ -0,0 +1,133 @@
+"""Partitioned Parquet store of transactions."""
+
+from datetime import date
+from pathlib import Path
+from typing import Iterable
+from uuid import uuid4
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from budget.transaction_loader.base import TRANSACTION_SCHEMA
+
+PARTITION_SCHEMA = pa.schema([("account", pa.string()), ("year", pa.int16()), ("month", pa.int8())])
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+ARROW_TYPES = {str: pa.string(), float: pa.float64(), int: pa.int64()}
+# Explicit, so that a store without any file yet can be filtered
+STORE_SCHEMA = pa.schema(
+    [pa.field(column.name, ARROW_TYPES[column.type]) for column in TRANSACTION_SCHEMA.columns]
+    + list(PARTITION_SCHEMA)
+)
+
+
+def _months_from(year: int, month: int) -> ds.Expression:
+    return (ds.field("year") > year) | ((ds.field("year") == year) & (ds.field("month") >= month))
+
+
+def _months_until(year: int, month: int) -> ds.Expression:
+    return (ds.field("year") < year) | ((ds.field("year") == year) & (ds.field("month") <= month))
+
+
+class TransactionStore:
+    """Transactions stored as Parquet files partitioned by account, year and month.
+
+    Appending writes new files next to the existing ones without rewriting them. Loading
+    filters are pushed down to pyarrow: partitions outside of the requested date range are
+    not opened, and row groups are skipped using their min/max statistics.
+    """
+
+    def __init__(self, root: str | Path, row_group_size: int = 64 * 1024) -> None:
+        self.root = Path(root)
+        self.row_group_size = row_group_size
+
+    @property
+    def dataset(self) -> ds.Dataset:
+        source = self.root if self.root.exists() else []
+        return ds.dataset(source, schema=STORE_SCHEMA, format="parquet", partitioning=PARTITIONING)
+
+    def append(self, transactions: pd.DataFrame, account: str) -> None:
+        # Sorting by date keeps row group statistics tight for date range filters
+        transactions = transactions.sort_values("event_date", kind="stable")
+        dates = pd.to_datetime(transactions["event_date"], format="%Y-%m-%d")
+        table = pa.Table.from_pandas(
+            transactions.assign(
+                account=account,
+                year=dates.dt.year.astype("int16"),
+                month=dates.dt.month.astype("int8"),
+            ),
+            preserve_index=False,
+        )
+        ds.write_dataset(
+            table,
+            self.root,
+            format="parquet",
+            partitioning=PARTITIONING,
+            basename_template=f"{uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            max_rows_per_group=self.row_group_size,
+            min_rows_per_group=min(self.row_group_size, 1024),
+        )
+
+    def get_filter(
+        self,
+        start: date | str | None = None,
+        end: date | str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        categories: Iterable[str] | None = None,
+        accounts: Iterable[str] | None = None,
+    ) -> ds.Expression | None:
+        """Build the pyarrow filter of `load`. Date bounds are inclusive."""
+        filters = []
+        if start is not None:
+            start = pd.Timestamp(start)
+            filters += [
+                _months_from(start.year, start.month),
+                ds.field("event_date") >= start.strftime("%Y-%m-%d"),
+            ]
+        if end is not None:
+            end = pd.Timestamp(end)
+            filters += [
+                _months_until(end.year, end.month),
+                ds.field("event_date") <= end.strftime("%Y-%m-%d"),
+            ]
+        if min_amount is not None:
+            filters.append(ds.field("amount") >= min_amount)
+        if max_amount is not None:
+            filters.append(ds.field("amount") <= max_amount)
+        if categories is not None:
+            filters.append(ds.field("category").isin(list(categories)))
+        if accounts is not None:
+            filters.append(ds.field("account").isin(list(accounts)))
+
+        expression = None
+        for f in filters:
+            expression = f if expression is None else expression & f
+        return expression
+
+    def load(
+        self,
+        start: date | str | None = None,
+        end: date | str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        categories: Iterable[str] | None = None,
+        accounts: Iterable[str] | None = None,
+    ) -> pd.DataFrame:
+        """Load the transactions matching all the given filters, with their account."""
+        dataset = self.dataset
+        expression = self.get_filter(
+            start=start,
+            end=end,
+            min_amount=min_amount,
+            max_amount=max_amount,
+            categories=categories,
+            accounts=accounts,
+        )
+        if next(iter(dataset.get_fragments()), None) is None:
+            table = STORE_SCHEMA.empty_table()
+        else:
+            table = dataset.to_table(filter=expression)
+        df = table.to_pandas().drop(columns=["year", "month"])
+        return df.sort_values(["event_date", "account"], kind="stable", ignore_index=True)
@@ -1,9 +1,14 @@
 from budget.transaction_loader.base import TransactionLoader
 from budget.transaction_loader.banque_populaire import BanquePopulaireLoader
 from budget.transaction_loader.credit_lyonnais import CreditLyonnaisLoader
+from budget.transaction_loader.cache import IngestionCache
+from budget.transaction_loader.ingest import Source, ingest
 
 __all__ = [
     "TransactionLoader",
     "BanquePopulaireLoader",
     "CreditLyonnaisLoader",
+    "IngestionCache",
+    "Source",
+    "ingest",
 ]
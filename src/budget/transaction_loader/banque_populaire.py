@@ -1,12 +1,11 @@
-from pathlib import Path
-
 import pandas as pd
-import pendulum
 
 from budget.transaction_loader import TransactionLoader
 
 
 class BanquePopulaireLoader(TransactionLoader):
+    dtypes = {"Debit": float, "Credit": float}
+
     def __init__(
         self,
         sep: str = ";",
@@ -16,18 +15,8 @@ class BanquePopulaireLoader(TransactionLoader):
     ):
         TransactionLoader.__init__(self, sep=sep, decimal=decimal, encoding=encoding, strict=strict)
 
-    def read_raw(self, path: str | Path) -> pd.DataFrame:
-        return pd.read_csv(path, sep=self.sep, decimal=self.decimal, encoding=self.encoding)
-
-    def get_event_date(self, df: pd.DataFrame) -> pd.Series:
-        return df["Date de comptabilisation"].apply(
-            lambda date: pendulum.from_format(date, fmt="DD/MM/YYYY").to_date_string()
-        )
-
-    def get_event_datetime(self, df: pd.DataFrame) -> pd.Series:
-        return df["Date de comptabilisation"].apply(
-            lambda date: pendulum.from_format(date, fmt="DD/MM/YYYY").to_iso8601_string()
-        )
+    def get_date(self, df: pd.DataFrame) -> pd.Series:
+        return df["Date de comptabilisation"]
 
     def get_description(self, df: pd.DataFrame) -> pd.Series:
         return df["Libelle operation"].fillna(df["Libelle simplifie"])
@@ -1,20 +1,54 @@
 from abc import ABC, abstractmethod
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Iterable, Iterator
 
+import numpy as np
 import pandas as pd
+from numpy.typing import NDArray
+from pandas.api.types import infer_dtype, is_float_dtype, is_integer_dtype, is_string_dtype
 
 from budget.exceptions import BudgetException
+from budget.profiling import LOADER_PARSE, PROFILER
+from budget.transaction_loader.cache import describe_file
+
+if TYPE_CHECKING:
+    from budget.transaction_loader.cache import IngestionCache
 
 
 class SchemaValidationException(BudgetException): ...
 
 
+DTYPE_CHECKS = {str: is_string_dtype, float: is_float_dtype, int: is_integer_dtype}
+INFERRED_TYPES = {str: "string", float: "floating", int: "integer"}
+
+
 @dataclass
 class Column:
     name: str
     type: type[str] | type[float] | type[int]
 
+    def get_invalid_rows(self, series: pd.Series) -> pd.Index:
+        """Index labels of the rows whose value doesn't have the column type.
+
+        The check runs on the column dtype and null mask. Only ``object`` columns that fail
+        the dtype inference are checked cell by cell, and only on their non-null rows.
+        """
+        # NaN is a float, so missing amounts are valid floats (but missing strings are not)
+        if self.type is float:
+            nulls = np.zeros(len(series), dtype=bool)
+        else:
+            nulls = series.isna().to_numpy()
+        if series.dtype != object:
+            return series.index[nulls] if DTYPE_CHECKS[self.type](series.dtype) else series.index
+        if infer_dtype(series, skipna=True) == INFERRED_TYPES[self.type]:
+            return series.index[nulls]
+        candidates = series[~nulls]
+        wrong_type = candidates.map(lambda value: not isinstance(value, self.type)).to_numpy(bool)
+        return series.index[nulls].union(candidates.index[wrong_type])
+
 
 @dataclass
 class Schema:
@@ -28,17 +62,73 @@ class Schema:
     def coltypes(self) -> list[type]:
         return [col.type for col in self.columns]
 
-    def validate(self, df: pd.DataFrame) -> None:
-        expected_types = {col.name: {col.type} for col in self.columns}
-        actual_types = {col: set(df[col].apply(type).values) for col in df.columns}
-        if actual_types != expected_types:
+    def validate(self, df: pd.DataFrame, max_samples: int = 5) -> None:
+        missing = [col for col in self.colnames if col not in df.columns]
+        unexpected = [col for col in df.columns if col not in self.colnames]
+        if missing or unexpected:
+            raise SchemaValidationException(
+                f"Dataframe doesn't comply with schema. Missing columns: {missing},"
+                f" unexpected columns: {unexpected}"
+            )
+
+        errors = []
+        for col in self.columns:
+            invalid = col.get_invalid_rows(df[col.name])
+            if len(invalid):
+                samples = ", ".join(str(row) for row in invalid[:max_samples])
+                more = ", ..." if len(invalid) > max_samples else ""
+                errors.append(
+                    f"{col.name} (expected {col.type.__name__}, dtype {df[col.name].dtype},"
+                    f" {len(invalid)} invalid rows: [{samples}{more}])"
+                )
+        if errors:
             raise SchemaValidationException(
                 f"Dataframe doesn't comply with schema."
-                f" Following columns have (some) wrong types: "
-                f"{set(col for col, types in actual_types.items() if types != expected_types[col])}"
+                f" Following columns have (some) wrong types: {'; '.join(errors)}"
             )
 
 
+# Columns of a normalized transaction that identify it within its account, along with
+# its occurrence among identical transactions
+TRANSACTION_KEY = ["event_date", "amount", "description"]
+# Index of the features of a dataset, holding `get_transaction_ids`
+TRANSACTION_ID_COLNAME = "transaction_id"
+
+
+def get_transaction_ids(transactions: pd.DataFrame, account: str = "") -> NDArray[np.uint64]:
+    """Deterministic hash of each transaction, that survives re-importing it.
+
+    Identical transactions (say, two coffees bought the same day) are told apart by their
+    occurrence counter, in file order. Ids are unique within a frame, and stable across
+    exports that cover whole days and list identical transactions in the same order.
+    ``account`` is hashed along, so that identical transactions of two accounts get
+    distinct ids.
+    """
+    key = transactions[TRANSACTION_KEY].astype({"amount": np.float64})
+    hashes = pd.util.hash_pandas_object(key, index=False).to_numpy()
+    occurrences = pd.Series(hashes).groupby(hashes, sort=False).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"account": account, "hash": hashes, "occurrence": occurrences}),
+        index=False,
+    ).to_numpy()
+
+
+def index_by_transaction_id(transactions: pd.DataFrame, account: str = "") -> pd.DataFrame:
+    """Transactions of ``account`` indexed by `get_transaction_ids`, unless they already are.
+
+    Frames missing a column of `TRANSACTION_KEY` are indexed by position instead.
+    """
+    if transactions.index.name == TRANSACTION_ID_COLNAME:
+        return transactions
+    if set(TRANSACTION_KEY).issubset(transactions.columns):
+        ids = pd.Index(get_transaction_ids(transactions, account), name=TRANSACTION_ID_COLNAME)
+    else:
+        ids = pd.RangeIndex(len(transactions), name=TRANSACTION_ID_COLNAME)
+    return transactions.set_axis(ids)
+
+
+DEFAULT_CHUNKSIZE = 100_000
+
 TRANSACTION_SCHEMA = Schema(
     columns=[
         Column(name="event_date", type=str),
@@ -51,7 +141,57 @@ TRANSACTION_SCHEMA = Schema(
 )
 
 
+def normalize_dates(dates: pd.Series, fmt: str = "%d/%m/%Y") -> tuple[pd.Series, pd.Series]:
+    """Parse a raw date column once and render it as ``event_date`` and ``event_datetime``.
+
+    Bank exports repeat the same few hundred dates across many rows, so only the unique
+    values are parsed and formatted, then broadcast back to the rows.
+    """
+    codes, uniques = pd.factorize(dates, use_na_sentinel=False)
+    parsed = pd.to_datetime(pd.Series(uniques), format=fmt)
+    event_date = parsed.dt.strftime("%Y-%m-%d").to_numpy(dtype=object)
+    event_datetime = parsed.dt.strftime("%Y-%m-%dT%H:%M:%SZ").to_numpy(dtype=object)
+    return (
+        pd.Series(event_date.take(codes), index=dates.index),
+        pd.Series(event_datetime.take(codes), index=dates.index),
+    )
+
+
+def skip_footer(chunks: Iterable[pd.DataFrame], n: int = 1) -> Iterator[pd.DataFrame]:
+    """Drop the last ``n`` rows of a chunked read.
+
+    This is the chunked counterpart of ``read_csv(skipfooter=n)``, which is only supported
+    by the slow python engine. Chunks are held back until ``n`` rows are known to follow
+    them, so at most a couple of chunks are kept in memory.
+    """
+    pending: deque[pd.DataFrame] = deque()
+    pending_rows = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_rows += len(chunk)
+        while pending_rows - len(pending[0]) >= n:
+            pending_rows -= len(pending[0])
+            yield pending.popleft()
+    if pending:
+        tail = pd.concat(pending) if len(pending) > 1 else pending[0]
+        if len(tail) > n:
+            yield tail.iloc[: len(tail) - n]
+
+
 class TransactionLoader(ABC):
+    """Reader of the CSV exports of a bank, normalizing them to `TRANSACTION_SCHEMA`.
+
+    Loaders describe their exports with class attributes: ``dtypes`` of the columns read
+    by `pandas.read_csv` (amounts are fixed to floats, so that they don't become integers
+    in chunks without cents), ``column_names`` replacing the header of the file if any,
+    and the number of ``footer_rows`` following the transactions.
+    """
+
+    date_format: str = "%d/%m/%Y"
+    dtypes: dict[str, type] = {}
+    column_names: list[str] | None = None
+    footer_rows: int = 0
+
     def __init__(
         self,
         sep: str = ";",
@@ -64,28 +204,83 @@ class TransactionLoader(ABC):
         self.encoding = encoding
         self.strict = strict
 
-    def read(self, path: str | Path) -> pd.DataFrame:
-        raw = self.read_raw(path=path)
-        df = pd.DataFrame().assign(
-            event_date=self.get_event_date(raw),
-            event_datetime=self.get_event_datetime(raw),
-            description=self.get_description(raw),
-            amount=self.get_amount(raw),
-            category=self.get_category(raw),
-            subcategory=self.get_subcategory(raw),
+    @property
+    def params(self) -> dict:
+        return dict(vars(self))
+
+    def read(self, path: str | Path, cache: "IngestionCache | None" = None) -> pd.DataFrame:
+        """Read transactions, reusing the cached result if the file was already parsed."""
+        if cache is None:
+            with PROFILER.phase(LOADER_PARSE):
+                return self.normalize(self.read_raw(path=path))
+
+        description = describe_file(path, self)
+        df = cache.get(description)
+        if df is None:
+            with PROFILER.phase(LOADER_PARSE):
+                df = self.normalize(self.read_raw(path=path))
+            cache.put(description, path, df)
+            cache.save()
+        return df
+
+    def read_iter(
+        self, path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE
+    ) -> Iterator[pd.DataFrame]:
+        """Read transactions as normalized chunks of at most ``chunksize`` rows."""
+        chunks = self.read_raw_iter(path=path, chunksize=chunksize)
+        while True:
+            # Reading a chunk happens in next(), which a phase can't wrap around a yield
+            start = perf_counter()
+            raw = next(chunks, None)
+            if raw is None:
+                return
+            df = self.normalize(raw)
+            if PROFILER.enabled:
+                PROFILER.record(LOADER_PARSE, perf_counter() - start)
+            yield df
+
+    def normalize(self, raw: pd.DataFrame) -> pd.DataFrame:
+        event_date, event_datetime = normalize_dates(self.get_date(raw), fmt=self.date_format)
+        df = pd.DataFrame(
+            {
+                "event_date": event_date,
+                "event_datetime": event_datetime,
+                "description": self.get_description(raw),
+                "amount": self.get_amount(raw),
+                "category": self.get_category(raw),
+                "subcategory": self.get_subcategory(raw),
+            }
         )
         if self.strict:
             TRANSACTION_SCHEMA.validate(df)
         return df
 
-    @abstractmethod
-    def read_raw(self, path: str | Path) -> pd.DataFrame: ...
+    def read_raw(self, path: str | Path) -> pd.DataFrame:
+        df = self._read_csv(path)
+        return df.iloc[: len(df) - self.footer_rows]
 
-    @abstractmethod
-    def get_event_date(self, df: pd.DataFrame) -> pd.Series: ...
+    def read_raw_iter(self, path: str | Path, chunksize: int) -> Iterator[pd.DataFrame]:
+        """Read the raw export by chunks, with the C engine and `skip_footer`."""
+        with self._read_csv(path, chunksize=chunksize) as reader:
+            if self.footer_rows:
+                yield from skip_footer(reader, n=self.footer_rows)
+            else:
+                yield from reader
+
+    def _read_csv(self, path: str | Path, **kwargs):
+        if self.column_names is not None:
+            kwargs.update(names=self.column_names, skiprows=1)
+        return pd.read_csv(
+            path,
+            sep=self.sep,
+            decimal=self.decimal,
+            encoding=self.encoding,
+            dtype=self.dtypes,
+            **kwargs,
+        )
 
     @abstractmethod
-    def get_event_datetime(self, df: pd.DataFrame) -> pd.Series: ...
+    def get_date(self, df: pd.DataFrame) -> pd.Series: ...
 
     @abstractmethod
     def get_description(self, df: pd.DataFrame) -> pd.Series: ...
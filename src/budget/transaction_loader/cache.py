@@ -0,0 +1,109 @@
+"""Cache of normalized transactions, keyed by the content of the export files."""
+
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from budget.transaction_loader.base import TransactionLoader
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def hash_file(path: str | Path, blocksize: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(blocksize):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@cache
+def hash_loader_code(loader_class: type) -> str:
+    """Hash of the modules defining a loader class and its bases, which change with a fix."""
+    digest = hashlib.sha256()
+    modules = {cls.__module__ for cls in loader_class.__mro__ if cls.__module__ != "builtins"}
+    for name in sorted(modules):
+        file = getattr(sys.modules[name], "__file__", None)
+        if file is not None:
+            digest.update(Path(file).read_bytes())
+    return digest.hexdigest()
+
+
+def describe_file(path: str | Path, loader: "TransactionLoader") -> dict:
+    """Everything the normalized transactions of an export file depend on."""
+    from budget.transaction_loader.base import TRANSACTION_SCHEMA
+
+    return {
+        "loader_code": hash_loader_code(type(loader)),
+        "schema": [[column.name, column.type.__name__] for column in TRANSACTION_SCHEMA.columns],
+        "content_hash": hash_file(path),
+        "loader": f"{type(loader).__module__}.{type(loader).__qualname__}",
+        "params": loader.params,
+    }
+
+
+class IngestionCache:
+    """Directory of normalized Parquet files, indexed by a JSON manifest.
+
+    Each manifest entry records the content hash of a parsed export, the loader and loader
+    parameters used to parse it and the location of its normalized output. Entries are keyed
+    by all of these, along with a hash of the loader code (`hash_loader_code`) and the
+    transaction schema, so editing a file, changing a loader parameter, editing a loader or
+    changing the schema triggers a new parse. Storing a file drops the entries it
+    supersedes, and saving drops the entries of files that no longer exist.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest_path = self.directory / MANIFEST_FILENAME
+        self.entries: dict[str, dict] = {}
+        if self.manifest_path.exists():
+            self.entries = json.loads(self.manifest_path.read_text())
+
+    @staticmethod
+    def get_key(description: dict) -> str:
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, description: dict) -> pd.DataFrame | None:
+        entry = self.entries.get(self.get_key(description))
+        if entry is None or not (self.directory / entry["output"]).exists():
+            return None
+        return pd.read_parquet(self.directory / entry["output"])
+
+    def put(self, description: dict, path: str | Path, df: pd.DataFrame) -> None:
+        """Store normalized transactions. The manifest is only written by `save`."""
+        key = self.get_key(description)
+        # Resolved, so that saving from another working directory keeps the entry
+        path = str(Path(path).resolve())
+        for old_key, entry in list(self.entries.items()):
+            if entry["path"] == path and old_key != key:
+                self.remove(old_key)
+        output = f"{key}.parquet"
+        df.to_parquet(self.directory / output)
+        self.entries[key] = {
+            **description,
+            "path": path,
+            "output": output,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def remove(self, key: str) -> None:
+        entry = self.entries.pop(key)
+        (self.directory / entry["output"]).unlink(missing_ok=True)
+
+    def save(self) -> None:
+        for key, entry in list(self.entries.items()):
+            if not Path(entry["path"]).exists():
+                self.remove(key)
+        tmp_path = self.manifest_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.manifest_path)
@@ -1,12 +1,23 @@
-from pathlib import Path
-
 import pandas as pd
-import pendulum
 
 from budget.transaction_loader import TransactionLoader
 
 
 class CreditLyonnaisLoader(TransactionLoader):
+    dtypes = {"Montant": float}
+    column_names = [
+        "Date",
+        "Montant",
+        "Type",
+        "Compte",
+        "Desc. debit",
+        "Desc. credit",
+        "Carte",
+        "Categorie",
+    ]
+    # The last line is a balance trailer rather than a transaction
+    footer_rows = 1
+
     def __init__(
         self,
         sep: str = ";",
@@ -18,39 +29,8 @@ class CreditLyonnaisLoader(TransactionLoader):
             self, sep=sep, decimal=decimal, encoding=encoding, strict=strict
         )
 
-    def read_raw(self, path: str | Path) -> pd.DataFrame:
-        columns = [
-            "Date",
-            "Montant",
-            "Type",
-            "Compte",
-            "Desc. debit",
-            "Desc. credit",
-            "Carte",
-            "Categorie",
-        ]
-        return pd.read_csv(
-            path,
-            sep=self.sep,
-            decimal=self.decimal,
-            encoding=self.encoding,
-            names=columns,
-            skiprows=1,
-            skipfooter=1,
-            engine="python",
-        )
-
-    def get_event_date(self, df: pd.DataFrame) -> pd.Series:
-        return df["Date"].apply(
-            lambda date: pendulum.from_format(date, fmt="DD/MM/YYYY").to_date_string()
-        )
-
-    def get_event_datetime(self, df: pd.DataFrame) -> pd.Series:
-        return df["Date"].apply(
-            lambda date: pendulum.from_format(
-                date, fmt="DD/MM/YYYY"
-            ).to_iso8601_string()
-        )
+    def get_date(self, df: pd.DataFrame) -> pd.Series:
+        return df["Date"]
 
     def get_description(self, df: pd.DataFrame) -> pd.Series:
         return df["Desc. debit"].fillna(df["Desc. credit"])
@@ -0,0 +1,107 @@
+"""Ingestion of many export files into one consolidated transaction table."""
+
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from glob import glob
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from budget.transaction_loader.base import (
+    TRANSACTION_SCHEMA,
+    TransactionLoader,
+    get_transaction_ids,
+)
+from budget.transaction_loader.cache import IngestionCache, describe_file
+
+
+@dataclass
+class Source:
+    """Export files of one account, matched by a glob pattern or a directory."""
+
+    pattern: str
+    loader: TransactionLoader
+
+    def get_paths(self) -> list[Path]:
+        if Path(self.pattern).is_dir():
+            paths = Path(self.pattern).iterdir()
+        else:
+            paths = (Path(path) for path in glob(self.pattern, recursive=True))
+        return sorted(path for path in paths if path.is_file())
+
+
+def _read(loader: TransactionLoader, path: Path) -> pd.DataFrame:
+    return loader.read(path)
+
+
+def drop_overlaps(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate consecutive exports of one account, chronologically.
+
+    Transactions found in the overlapping date ranges of several exports are kept once.
+    Rows are matched on their `get_transaction_ids`, computed within their own export, so
+    that identical transactions of a same export (two coffees on the same day) are all kept.
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=TRANSACTION_SCHEMA.colnames)
+    frames = sorted(frames, key=lambda frame: frame["event_date"].min())
+    df = pd.concat(frames, ignore_index=True)
+    ids = np.concatenate([get_transaction_ids(frame) for frame in frames])
+    duplicated = pd.Index(ids).duplicated()
+    return df[~duplicated].sort_values("event_date", kind="stable", ignore_index=True)
+
+
+def ingest(
+    sources: Iterable[Source],
+    output: str | Path | None = None,
+    max_workers: int | None = None,
+    cache: IngestionCache | None = None,
+) -> pd.DataFrame:
+    """Read all files of all sources in a process pool and consolidate them.
+
+    Args:
+        sources: Accounts to ingest, each with its own loader
+        output: Optional Parquet file to write the consolidated transactions to
+        max_workers: Number of worker processes, defaults to the number of cores
+        cache: Optional cache of normalized transactions, only new or modified files
+            are parsed
+    """
+    tasks = [
+        (i, source.loader, path) for i, source in enumerate(sources) for path in source.get_paths()
+    ]
+    frames: list[pd.DataFrame | None] = [None] * len(tasks)
+    descriptions: list[dict | None] = [None] * len(tasks)
+    if cache is not None:
+        for i, (_, loader, path) in enumerate(tasks):
+            descriptions[i] = describe_file(path, loader)
+            frames[i] = cache.get(descriptions[i])
+
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+    loaders = [tasks[i][1] for i in missing]
+    paths = [tasks[i][2] for i in missing]
+    if max_workers == 1 or len(missing) <= 1:
+        parsed = map(_read, loaders, paths)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            parsed = list(executor.map(_read, loaders, paths))
+    for i, frame in zip(missing, parsed):
+        frames[i] = frame
+        if cache is not None:
+            cache.put(descriptions[i], tasks[i][2], frame)
+    if cache is not None and missing:
+        cache.save()
+
+    by_source: dict[int, list[pd.DataFrame]] = {}
+    for (source_id, _, _), frame in zip(tasks, frames):
+        by_source.setdefault(source_id, []).append(frame)
+    consolidated = pd.concat(
+        [drop_overlaps(source_frames) for source_frames in by_source.values()]
+        or [drop_overlaps([])],
+        ignore_index=True,
+    )
+
+    if output is not None:
+        consolidated.to_parquet(output, index=False)
+    return consolidated
@@ -0,0 +1,60 @@
+from collections.abc import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from budget.ml.active_learning.models import Dataset
+from budget.transaction_loader.base import index_by_transaction_id
+
+
+@pytest.fixture
+def merchants() -> dict[str, str]:
+    """Label of the card payments to each merchant of `make_dataset`."""
+    return {"CARREFOUR": "food", "SNCF": "transportation", "EDF": "energy"}
+
+
+@pytest.fixture
+def make_dataset(merchants: dict[str, str]) -> Callable[..., Dataset]:
+    """Build datasets of card payments to random `merchants`.
+
+    The factory takes the number of records (``size``), the number of leading records
+    labeled after their merchant (``n_labeled``), whether records are spread over
+    consecutive days rather than a single one (``daily``), whether descriptions are
+    numbered so that they're all distinct (``numbered``), and optionally ``descriptions``
+    replacing the generated ones.
+    """
+
+    def make(
+        size: int = 200,
+        n_labeled: int = 0,
+        daily: bool = False,
+        numbered: bool = False,
+        descriptions: list[str] | None = None,
+    ) -> Dataset:
+        rng = np.random.default_rng(0)
+        picked = rng.choice(list(merchants), size=size)
+        if descriptions is None:
+            descriptions = [
+                f"CB {merchant} {i}" if numbered else f"CB {merchant}"
+                for i, merchant in enumerate(picked)
+            ]
+        if daily:
+            dates = pd.date_range("2024-01-01", periods=size, freq="D").strftime("%Y-%m-%d")
+        else:
+            dates = "2024-01-01"
+        transactions = pd.DataFrame(
+            {
+                "event_date": dates,
+                "description": descriptions,
+                "amount": rng.normal(-50, 20, size=size),
+                "category": "Categorie",
+                "subcategory": "Sous-categorie",
+            }
+        )
+        dataset = Dataset.from_dataframe(index_by_transaction_id(transactions))
+        for index in range(n_labeled):
+            dataset[index].label_as(merchants[picked[index]])
+        return dataset
+
+    return make
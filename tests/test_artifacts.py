@@ -0,0 +1,31 @@
+from pathlib import Path
+
+from budget.ml.active_learning.artifacts import get_artifact_paths, load_model, save_model
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import LABEL_COLNAME, Dataset
+from budget.ml.active_learning.prediction import read_labeled
+
+
+def test_model_artifacts(tmp_path: Path, make_dataset) -> None:
+    dataset = make_dataset(size=20, n_labeled=8)
+    training_tx = dataset.to_dataframe(dataset.labeled_indices())
+    model = get_default_model().fit(training_tx, training_tx[LABEL_COLNAME])
+
+    checkpoint = tmp_path / "labels.parquet"
+    dataset.dump(checkpoint)
+    save_model(model, dataset, checkpoint)
+    assert [path.name for path in get_artifact_paths(checkpoint)] == [
+        "labels.model.joblib",
+        "labels.model.json",
+    ]
+
+    resumed = Dataset.from_file(checkpoint)
+    loaded = load_model(checkpoint, resumed)
+    assert loaded is not None
+    features = dataset.features
+    assert loaded.predict(features).tolist() == model.predict(features).tolist()
+    assert load_model(checkpoint, Dataset.from_dataframe(read_labeled(checkpoint))) is not None
+
+    resumed[10].label_as("food")
+    assert load_model(checkpoint, resumed) is None
+    assert load_model(tmp_path / "other.parquet", dataset) is None
@@ -1,6 +1,10 @@
 from pathlib import Path
 
-from budget.ml.active_learning.models import Dataset, Record
+import pandas as pd
+import pytest
+
+from budget.ml.active_learning.models import LABEL_COLNAME, Dataset
+from budget.transaction_loader.base import get_transaction_ids, index_by_transaction_id
 
 
 def test_dataset_dump_load(tmp_path: Path) -> None:
@@ -8,12 +12,93 @@ def test_dataset_dump_load(tmp_path: Path) -> None:
         {"a": 1, "b": 3, "c": 5},
         {"a": 2, "b": 4, "c": 6},
     ]
-    records = [Record(_) for _ in data]
-    records[0].label_as("first")
+    dataset = Dataset.from_dataframe(pd.DataFrame(data))
+    dataset[0].label_as("first")
 
-    dataset = Dataset(records=records)
     filepath = tmp_path / "dataset.parquet"
     dataset.dump(filepath)
     loaded_dataset = Dataset.from_file(filepath)
     assert loaded_dataset.records[0].data == data[0]
     assert [record.label for record in loaded_dataset.records] == ["first", None]
+    # Transaction ids are dumped along with the records
+    assert [record.id for record in loaded_dataset.records] == [
+        record.id for record in dataset.records
+    ]
+
+
+def test_dataset_label_bookkeeping() -> None:
+    df = pd.DataFrame({"a": range(5), LABEL_COLNAME: ["x", None, "y", None, "x"]})
+    dataset = Dataset.from_dataframe(df)
+    assert (dataset.n_labeled, dataset.n_unlabeled) == (3, 2)
+    assert dataset.label_counts == {"x": 2, "y": 1}
+
+    dataset[1].label_as("y")
+    dataset[0].label_as("y")
+    dataset.set_label(4, None)
+    assert dataset.label_counts == {"y": 3}
+    assert dataset.labeled_indices().tolist() == [0, 1, 2]
+    assert dataset.get_unlabeled().tolist() == [False, False, False, True, True]
+    assert dataset.to_dataframe(dataset.labeled_indices())[LABEL_COLNAME].tolist() == ["y"] * 3
+
+    dataset.set_label(-1, "x")
+    dataset.set_label(4, "y")
+    assert dataset.labeled_indices().tolist() == [0, 1, 2, 4]
+    assert (dataset.n_labeled, dataset.label_counts) == (4, {"y": 4})
+
+
+def test_dataset_merge() -> None:
+    transactions = pd.DataFrame(
+        {
+            "event_date": ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-03"],
+            "description": ["CB CAFE", "CB CAFE", "CB SNCF", "PRLV EDF"],
+            "amount": [-2.5, -2.5, -40.0, -80.2],
+        }
+    )
+    ids = get_transaction_ids(transactions)
+    # Identical transactions are told apart by their occurrence
+    assert len(set(ids.tolist())) == 4
+    assert get_transaction_ids(transactions.iloc[:3]).tolist() == ids[:3].tolist()
+
+    dataset = Dataset.from_dataframe(index_by_transaction_id(transactions.iloc[:3]))
+    dataset[1].label_as("food")
+    dataset[2].label_as("transportation")
+    # Next export overlaps the first one, with a third coffee
+    export = pd.DataFrame(
+        {
+            "event_date": ["2024-01-01", "2024-01-01", "2024-01-01", "2024-01-03"],
+            "description": ["CB CAFE", "CB CAFE", "CB CAFE", "PRLV EDF"],
+            "amount": [-2.5, -2.5, -2.5, -80.2],
+        }
+    )
+    export = index_by_transaction_id(export)
+    merged = dataset.merge(export)
+    assert merged.features["description"].tolist() == [
+        "CB CAFE",
+        "CB CAFE",
+        "CB SNCF",
+        "CB CAFE",
+        "PRLV EDF",
+    ]
+    assert merged.labels.tolist() == [None, "food", "transportation", None, None]
+    assert merged.merge(export).features.equals(merged.features)
+    assert [record.id for record in merged.records[:3]] == ids[:3].tolist()
+    with pytest.raises(ValueError, match="must be indexed"):
+        dataset.merge(transactions)
+
+
+def test_index_by_transaction_id() -> None:
+    # Frames that aren't transactions are indexed by position
+    assert index_by_transaction_id(pd.DataFrame({"a": [1, 2]})).index.tolist() == [0, 1]
+    assert Dataset.from_dataframe(pd.DataFrame({"a": [1]}))[0].id == 0
+
+
+def test_dataset_merge_keeps_accounts_apart() -> None:
+    transactions = pd.DataFrame(
+        {"event_date": ["2024-01-01"], "description": ["CB CAFE"], "amount": [-2.5]}
+    )
+    dataset = Dataset.from_dataframe(index_by_transaction_id(transactions, "checking"))
+    dataset[0].label_as("food")
+    merged = dataset.merge(index_by_transaction_id(transactions, "savings"))
+    assert merged.labels.tolist() == ["food", None]
+    merged = merged.merge(index_by_transaction_id(transactions, "checking"))
+    assert len(merged) == 2
@@ -0,0 +1,49 @@
+import pytest
+
+from budget.ml.active_learning.grouping import DescriptionGroups, normalize_description
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import Dataset
+from budget.ml.active_learning.strategies import AmbiguousStrategy
+
+
+@pytest.mark.parametrize(
+    argnames=("description", "expected"),
+    argvalues=[
+        ("CB  MP*CARREFOUR     27/07/25", "CB MP CARREFOUR"),
+        ("PAIEMENT CB 4974XXXX1234 AMAZON EU", "PAIEMENT CB AMAZON EU"),
+        ("PRLV SEPA EDF REF 123456", "PRLV SEPA EDF"),
+        ("VIR N° 12345 LOYER", "VIR LOYER"),
+        ("VIR.PERMANENT ******E", "VIR PERMANENT"),
+        ("00**1 ***966S", "00**1 ***966S"),
+    ],
+)
+def test_normalize_description(description, expected):
+    assert normalize_description(description) == expected
+
+
+@pytest.fixture
+def dataset(make_dataset) -> Dataset:
+    descriptions = ["CB CARREFOUR 12/03", "CB SNCF 12/03", "CB CARREFOUR 13/03", "CB EDF"] * 5
+    return make_dataset(size=len(descriptions), descriptions=descriptions)
+
+
+def test_description_groups(dataset):
+    groups = DescriptionGroups.from_dataset(dataset)
+    assert len(groups) == 3
+    assert groups.members(0).tolist() == [0, 2, 4, 6, 8, 10, 12, 14, 16, 18]
+    assert groups.representatives(groups.members(1)).tolist() == [1]
+
+    dataset[2].label_as("food")
+    dataset[0].label_as("consumer_goods")
+    assert groups.propagate(dataset, 0).tolist() == [4, 6, 8, 10, 12, 14, 16, 18]
+    assert dataset[2].label == "food"
+    assert dataset.label_counts["consumer_goods"] == 9
+
+
+def test_strategy_picks_group_representatives(dataset):
+    groups = DescriptionGroups.from_dataset(dataset)
+    for index, label in [(0, "food"), (1, "transportation"), (3, "energy")]:
+        dataset[index].label_as(label)
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=True, groups=groups)
+    picks = strategy.pick_batch(dataset, k=10)
+    assert sorted(pick.record.index for pick in picks) == [2, 5, 7]
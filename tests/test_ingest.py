@@ -0,0 +1,98 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from typer import BadParameter
+
+from budget.cli.ingest import parse_source
+from budget.transaction_loader import BanquePopulaireLoader, IngestionCache, Source, ingest
+from budget.transaction_loader import cache as cache_module
+from budget.transaction_loader.ingest import drop_overlaps
+
+TRANSACTIONS = Path(__file__).parent / "data" / "transactions"
+
+
+def test_drop_overlaps_keeps_duplicates_within_an_export():
+    first = pd.DataFrame(
+        {
+            "event_date": ["2024-01-30", "2024-01-31", "2024-01-31"],
+            "amount": [-1.0, -2.0, -2.0],
+            "description": ["bakery", "coffee", "coffee"],
+        }
+    )
+    second = pd.DataFrame(
+        {
+            "event_date": ["2024-01-31", "2024-01-31", "2024-02-01"],
+            "amount": [-2.0, -2.0, -3.0],
+            "description": ["coffee", "coffee", "bakery"],
+        }
+    )
+    df = drop_overlaps([second, first])
+    assert df["event_date"].tolist() == ["2024-01-30", "2024-01-31", "2024-01-31", "2024-02-01"]
+
+
+def test_ingest(tmp_path: Path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    for month in ["2024-01", "2024-02"]:
+        shutil.copy(TRANSACTIONS / "banque_populaire.csv", exports / f"{month}.csv")
+
+    output = tmp_path / "transactions.parquet"
+    df = ingest([Source(pattern=str(exports), loader=BanquePopulaireLoader())], output=output)
+    expected = BanquePopulaireLoader().read(TRANSACTIONS / "banque_populaire.csv")
+    assert len(df) == len(expected)
+    pd.testing.assert_frame_equal(pd.read_parquet(output), df)
+
+
+def test_ingestion_cache(tmp_path: Path, monkeypatch):
+    path = tmp_path / "export.csv"
+    shutil.copy(TRANSACTIONS / "banque_populaire.csv", path)
+    cache = IngestionCache(tmp_path / "cache")
+    expected = BanquePopulaireLoader().read(path, cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("Cached file shouldn't be parsed again")
+
+    with monkeypatch.context() as m:
+        m.setattr(BanquePopulaireLoader, "read_raw", fail)
+        sources = [Source(pattern=str(path), loader=BanquePopulaireLoader())]
+        df = ingest(sources, cache=IngestionCache(tmp_path / "cache"))
+    pd.testing.assert_frame_equal(df, expected)
+
+    with path.open("a", encoding="latin") as f:
+        f.write("30/01/2024;NEW;NEW;REF;;Carte bancaire;Categorie;Sous categorie;-1,00;;;;0\n")
+    assert len(BanquePopulaireLoader().read(path, cache=cache)) == len(expected) + 1
+    # The entry of the previous content is dropped, along with its output
+    assert len(cache.entries) == 1
+    assert len(list(cache.directory.glob("*.parquet"))) == 1
+
+    # Editing the loader parses the file again
+    keys = list(cache.entries)
+    monkeypatch.setattr(cache_module, "hash_loader_code", lambda loader_class: "edited")
+    BanquePopulaireLoader().read(path, cache=cache)
+    assert list(cache.entries) != keys
+
+    path.unlink()
+    cache.save()
+    assert not cache.entries
+    assert not list(cache.directory.glob("*.parquet"))
+
+
+def test_ingestion_cache_keeps_relative_paths(tmp_path: Path, monkeypatch):
+    shutil.copy(TRANSACTIONS / "banque_populaire.csv", tmp_path / "export.csv")
+    cache = IngestionCache(tmp_path / "cache")
+    monkeypatch.chdir(tmp_path)
+    BanquePopulaireLoader().read("export.csv", cache=cache)
+    (tmp_path / "elsewhere").mkdir()
+    monkeypatch.chdir(tmp_path / "elsewhere")
+    cache.save()
+    assert len(cache.entries) == 1
+    assert len(list(cache.directory.glob("*.parquet"))) == 1
+
+
+def test_parse_source():
+    source = parse_source(f"banque-populaire={TRANSACTIONS / 'banque_populaire.csv'}")
+    assert isinstance(source.loader, BanquePopulaireLoader)
+    with pytest.raises(BadParameter, match="nomatch"):
+        parse_source(f"banque-populaire={TRANSACTIONS / 'nomatch*.csv'}")
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from budget.ml.active_learning.journal import LabelJournal
+from budget.ml.active_learning.models import Dataset
+
+
+@pytest.fixture
+def dataset(make_dataset) -> Dataset:
+    return make_dataset(size=4, daily=True)
+
+
+def test_label_journal(tmp_path: Path, dataset: Dataset) -> None:
+    checkpoint = tmp_path / "labels.parquet"
+    journal = LabelJournal(checkpoint, compact_every=3)
+    journal.compact(dataset)
+    assert journal.path.name == "labels.journal.jsonl"
+
+    for index, label in [(0, "food"), (1, "transportation"), (0, None)]:
+        dataset.set_label(index, label)
+        journal.append(dataset[index].id, label)
+    assert journal.should_compact
+    journal.close()
+    # A crash while appending leaves a truncated line behind
+    with journal.path.open("a") as file:
+        file.write('{"id": 2, "lab')
+
+    resumed = Dataset.from_file(checkpoint)
+    assert resumed.n_labeled == 0
+    assert LabelJournal(checkpoint).replay(resumed) == 3
+    assert resumed.labels.tolist() == [None, "transportation", None, None]
+
+    resumed.set_label(3, "consumer_goods")
+    journal.compact(resumed)
+    assert not journal.path.exists()
+    assert not journal.should_compact
+    assert Dataset.from_file(checkpoint).labels.tolist() == resumed.labels.tolist()
+    assert LabelJournal(checkpoint).replay(resumed) == 0
+
+
+def test_label_journal_follows_transactions(tmp_path: Path, dataset: Dataset) -> None:
+    checkpoint = tmp_path / "labels.parquet"
+    journal = LabelJournal(checkpoint)
+    journal.compact(dataset)
+    journal.append(dataset[2].id, "energy")
+    journal.close()
+
+    # The checkpoint was written again with its rows in another order
+    Dataset.from_dataframe(dataset.features.iloc[::-1]).dump(checkpoint)
+    resumed = Dataset.from_file(checkpoint)
+    assert journal.replay(resumed) == 1
+    assert resumed.labels.tolist() == [None, "energy", None, None]
+
+    Dataset.from_dataframe(dataset.features.iloc[:2]).dump(checkpoint)
+    with pytest.raises(ValueError, match="missing from the dataset"):
+        journal.replay(Dataset.from_file(checkpoint))
+
+
+def test_label_journal_resumes_after_a_crash(tmp_path: Path, dataset: Dataset) -> None:
+    checkpoint = tmp_path / "labels.parquet"
+    journal = LabelJournal(checkpoint)
+    journal.compact(dataset)
+    journal.append(dataset[0].id, "food")
+    journal.close()
+    with journal.path.open("a") as file:
+        file.write('{"id": 2, "lab')
+
+    # Resuming in place keeps appending to the same journal
+    for index, label in [(1, "transportation"), (3, "consumer_goods")]:
+        resumed = Dataset.from_file(checkpoint)
+        journal = LabelJournal(checkpoint)
+        journal.replay(resumed)
+        journal.append(resumed[index].id, label)
+        journal.close()
+
+    resumed = Dataset.from_file(checkpoint)
+    assert LabelJournal(checkpoint).replay(resumed) == 3
+    assert resumed.labels.tolist() == ["food", "transportation", None, "consumer_goods"]
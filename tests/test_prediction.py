@@ -0,0 +1,93 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import LABEL_COLNAME, Dataset
+from budget.ml.active_learning.prediction import (
+    CONFIDENCE_COLNAME,
+    PREDICTED_LABEL_COLNAME,
+    Backend,
+    ChunkedPredictor,
+    predict_file,
+    read_labeled,
+)
+from budget.ml.active_learning.strategies import AmbiguousStrategy
+
+
+@pytest.fixture
+def dataset(make_dataset) -> Dataset:
+    return make_dataset(size=200, n_labeled=100)
+
+
+def test_predict_file(tmp_path: Path, dataset: Dataset, merchants: dict[str, str]) -> None:
+    checkpoint = tmp_path / "checkpoint.parquet"
+    dataset.dump(checkpoint)
+
+    training_tx = read_labeled(checkpoint)
+    assert len(training_tx) == 100
+    model = get_default_model()
+    model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
+
+    output = tmp_path / "predictions.parquet"
+    n_predicted, n_unlabeled = predict_file(model, checkpoint, output, batch_size=30)
+    assert (n_predicted, n_unlabeled) == (100, 100)
+
+    predictions = pd.read_parquet(output)
+    assert len(predictions) == 200
+    assert predictions[PREDICTED_LABEL_COLNAME].iloc[:100].isna().all()
+    descriptions = dataset.features["description"].iloc[100:]
+    expected = [merchants[description.removeprefix("CB ")] for description in descriptions]
+    assert predictions[PREDICTED_LABEL_COLNAME].iloc[100:].tolist() == expected
+    assert (predictions[CONFIDENCE_COLNAME].iloc[100:] >= 0.9).all()
+    # Predictions keep the transaction ids and labels of the checkpoint
+    predicted = Dataset.from_file(output)
+    assert predicted.features.index.equals(dataset.features.index)
+    assert predicted.labels.tolist() == dataset.labels.tolist()
+
+
+@pytest.mark.parametrize("backend", list(Backend))
+def test_chunked_predictor(backend, dataset: Dataset) -> None:
+    training_tx = dataset.to_dataframe(dataset.labeled_indices())
+    model = get_default_model()
+    model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
+
+    with ChunkedPredictor(chunk_size=30, n_jobs=2, backend=backend) as predictor:
+        proba = predictor.predict_proba(model, dataset.features)
+    np.testing.assert_array_equal(proba, model.predict_proba(dataset.features))
+
+
+def test_chunked_predictor_reuses_its_pool(dataset: Dataset) -> None:
+    training_tx = dataset.to_dataframe(dataset.labeled_indices())
+    model = get_default_model()
+    model.fit(X=training_tx, y=training_tx[LABEL_COLNAME])
+    n_jobs = model[-1].n_jobs
+
+    with ChunkedPredictor(chunk_size=30, n_jobs=2) as predictor:
+        predictor.predict_proba(model, dataset.features)
+        executor = predictor.get_executor(model)
+        predictor.predict_proba(model, dataset.features)
+        assert predictor.get_executor(model) is executor
+        # Threads of the classifier are only limited while predicting
+        assert model[-1].n_jobs == n_jobs
+    assert predictor._executor is None
+
+
+def test_process_predictor_follows_refits(dataset: Dataset) -> None:
+    predictor = ChunkedPredictor(chunk_size=30, n_jobs=2, backend=Backend.PROCESS)
+    strategy = AmbiguousStrategy(model=get_default_model(), predictor=predictor)
+    try:
+        strategy.fit(dataset)
+        rows = np.flatnonzero(dataset.get_unlabeled())
+        before = strategy.predict_proba(dataset, rows)
+        for index in rows[:20]:
+            dataset.set_label(int(index), "energy")
+        strategy.fit(dataset)
+        after = strategy.predict_proba(dataset, rows)
+        assert not np.allclose(before, after)
+        X = strategy.features.get(dataset)[rows]
+        np.testing.assert_allclose(after, strategy.classifier.predict_proba(X))
+    finally:
+        predictor.close()
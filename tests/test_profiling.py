@@ -0,0 +1,63 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from budget.ml.active_learning.learner import get_default_model
+from budget.ml.active_learning.models import Dataset
+from budget.ml.active_learning.strategies import AmbiguousStrategy
+from budget.profiling import LOADER_PARSE, PROFILER, RANKING, Histogram, Profiler
+from budget.transaction_loader import BanquePopulaireLoader
+
+TRANSACTIONS = Path(__file__).parent / "data" / "transactions"
+
+
+def test_histogram():
+    histogram = Histogram()
+    for latency in [0.001] * 90 + [0.1] * 9 + [2.0]:
+        histogram.record(latency)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert summary["mean"] == pytest.approx((0.09 + 0.9 + 2.0) / 100)
+    assert 0.001 <= summary["p50"] <= 0.001 * 1.19
+    assert 0.1 <= summary["p99"] <= 0.1 * 1.19
+    assert summary["max"] == 2.0
+    histogram.record(0.0)
+    histogram.record(1e6)
+    assert histogram.summary()["max"] == 1e6
+
+
+def test_profiler(tmp_path: Path):
+    profiler = Profiler()
+    with profiler.phase("fit"):
+        pass
+    assert profiler.summary() == {}
+
+    profiler.enabled = True
+    for _ in range(3):
+        with profiler.phase("fit"):
+            pass
+    path = tmp_path / "profile.json"
+    profiler.dump(path)
+    assert json.loads(path.read_text())["fit"]["count"] == 3
+    assert "fit" in profiler.format()
+
+
+def test_phases_of_a_pick(monkeypatch):
+    monkeypatch.setattr(PROFILER, "enabled", True)
+    PROFILER.reset()
+    try:
+        chunks = list(BanquePopulaireLoader().read_iter(TRANSACTIONS / "banque_populaire.csv"))
+        dataset = Dataset.from_dataframe(pd.concat(chunks, ignore_index=True))
+        for index, label in enumerate(["food", "housing"]):
+            dataset[index].label_as(label)
+        strategy = AmbiguousStrategy(model=get_default_model(), refit=True)
+        for _ in range(2):
+            strategy.pick(dataset).record.label_as("food")
+        summary = PROFILER.summary()
+    finally:
+        PROFILER.reset()
+    assert summary[LOADER_PARSE]["count"] == len(chunks)
+    # Scoring and ranking are timed once per pick
+    assert summary[RANKING]["count"] == 2
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from budget.ml.active_learning.scoring import (
+    CandidateHeap,
+    Uncertainty,
+    entropy,
+    least_confidence,
+    margin,
+    select_most_uncertain,
+)
+
+
+@pytest.fixture
+def proba() -> np.ndarray:
+    return np.random.default_rng(0).dirichlet(np.ones(15), size=1000)
+
+
+def test_scorers(proba):
+    top2 = np.sort(proba, axis=1)[:, -2:]
+    with np.errstate(divide="ignore"):
+        expected_entropy = -np.sum(proba * np.log(proba), axis=1)
+    np.testing.assert_allclose(least_confidence(proba.copy()), 1 - top2[:, 1])
+    np.testing.assert_allclose(margin(proba.copy()), 1 - (top2[:, 1] - top2[:, 0]))
+    np.testing.assert_allclose(entropy(proba.copy()), expected_entropy)
+
+
+@pytest.mark.parametrize("uncertainty", list(Uncertainty))
+def test_scorers_work_in_place(uncertainty, proba):
+    out = np.empty(len(proba))
+    assert uncertainty.score(proba, out=out) is out
+
+
+def test_select_most_uncertain():
+    scores = np.array([0.1, 0.5, 0.3, 0.5, 0.9])
+    assert select_most_uncertain(scores, 3).tolist() == [4, 1, 3]
+    assert select_most_uncertain(scores, 10).tolist() == [4, 1, 3, 2, 0]
+
+
+def test_candidate_heap_partial_updates():
+    rng = np.random.default_rng(0)
+    heap = CandidateHeap(size=1000, capacity=10)
+    expected = np.full(1000, -np.inf)
+    for _ in range(20):
+        positions = rng.choice(1000, size=100, replace=False)
+        scores = rng.random(100)
+        heap.update(positions, scores)
+        expected[positions] = scores
+        discarded = rng.choice(1000, size=20, replace=False)
+        heap.discard(discarded)
+        expected[discarded] = -np.inf
+        assert heap.best(5).tolist() == select_most_uncertain(expected, 5).tolist()
+
+
+def test_candidate_heap_serves_larger_requests_without_growing():
+    rng = np.random.default_rng(0)
+    heap = CandidateHeap(size=1000, capacity=10)
+    scores = rng.random(1000)
+    heap.update(np.arange(1000), scores)
+    assert heap.best(50).tolist() == select_most_uncertain(scores, 50).tolist()
+    assert heap.capacity == 10
+    assert len(heap) == 10
+
+
+def test_candidate_heap_refills_from_floor():
+    rng = np.random.default_rng(0)
+    heap = CandidateHeap(size=1000, capacity=20)
+    expected = rng.random(1000)
+    heap.update(np.arange(1000), expected.copy())
+    for _ in range(5):
+        best = heap.best(10)
+        assert best.tolist() == select_most_uncertain(expected, 10).tolist()
+        heap.discard(best[:3])
+        expected[best[:3]] = -np.inf
+    # Refilled once, on the fifth pick
+    assert len(heap) == 17
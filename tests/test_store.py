@@ -0,0 +1,53 @@
+from pathlib import Path
+
+import pandas as pd
+
+from budget.store import TransactionStore
+
+
+def make_transactions(dates: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "event_date": dates,
+            "event_datetime": [f"{date}T00:00:00Z" for date in dates],
+            "description": [f"transaction {i}" for i in range(len(dates))],
+            "amount": [-10.0 * (i + 1) for i in range(len(dates))],
+            "category": ["food" if i % 2 else "housing" for i in range(len(dates))],
+            "subcategory": ["sub"] * len(dates),
+        }
+    )
+
+
+def test_transaction_store(tmp_path: Path):
+    store = TransactionStore(tmp_path / "store")
+    assert store.load().empty
+
+    store.append(make_transactions(["2023-12-31", "2024-01-15", "2024-02-01"]), account="main")
+    store.append(make_transactions(["2024-02-10", "2024-03-05"]), account="main")
+    store.append(make_transactions(["2024-02-20"]), account="savings")
+
+    assert len(store.load()) == 6
+    df = store.load(start="2024-02-01", end="2024-02-29")
+    assert df["event_date"].tolist() == ["2024-02-01", "2024-02-10", "2024-02-20"]
+    assert df["account"].tolist() == ["main", "main", "savings"]
+    assert len(store.load(start="2024-02-01", accounts=["main"], max_amount=-15.0)) == 2
+    assert set(store.load(categories=["food"])["category"]) == {"food"}
+
+    fragments = store.dataset.get_fragments(filter=store.get_filter(start="2024-03-01"))
+    assert len(list(fragments)) == 1
+
+
+def test_empty_transaction_store(tmp_path: Path):
+    for root in [tmp_path / "missing", tmp_path]:
+        df = TransactionStore(root).load(start="2024-01-01", accounts=["main"])
+        assert df.empty
+        assert df.columns.tolist() == [
+            "event_date",
+            "event_datetime",
+            "description",
+            "amount",
+            "category",
+            "subcategory",
+            "account",
+        ]
+        assert df["amount"].dtype == "float64"
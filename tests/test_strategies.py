@@ -0,0 +1,191 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from budget.ml.active_learning.exceptions import NoMoreUnlabeledRecord
+from budget.ml.active_learning.features import FeatureCache
+from budget.ml.active_learning.grouping import normalize_description
+from budget.ml.active_learning.learner import Vectorizer, get_default_model
+from budget.ml.active_learning.models import Dataset
+from budget.ml.active_learning.scoring import Uncertainty
+from budget.ml.active_learning.strategies import (
+    AmbiguousStrategy,
+    CandidatePool,
+    RandomStrategy,
+    RefitPolicy,
+)
+from budget.transaction_loader import BanquePopulaireLoader, CreditLyonnaisLoader
+
+TRANSACTIONS = Path(__file__).parent / "data" / "transactions"
+
+
+@pytest.fixture
+def dataset() -> Dataset:
+    transactions = pd.concat(
+        [
+            BanquePopulaireLoader().read(TRANSACTIONS / "banque_populaire.csv"),
+            CreditLyonnaisLoader().read(TRANSACTIONS / "credit_lyonnais.csv"),
+        ],
+        ignore_index=True,
+    )
+    dataset = Dataset.from_dataframe(transactions)
+    for index, label in [(0, "food"), (1, "housing"), (2, "restaurant"), (3, "income")]:
+        dataset[index].label_as(label)
+    return dataset
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        RandomStrategy(),
+        AmbiguousStrategy(model=get_default_model(), refit=True),
+        AmbiguousStrategy(model=get_default_model(), refit=True, cache_features=False),
+        AmbiguousStrategy(model=get_default_model(), refit=True, uncertainty=Uncertainty.ENTROPY),
+        AmbiguousStrategy(model=get_default_model(Vectorizer.HASHING, n_features=256), refit=True),
+        AmbiguousStrategy(
+            model=get_default_model(),
+            refit=True,
+            pool=CandidatePool(size=5, stratified=True, rescore_every=3),
+        ),
+    ],
+)
+def test_strategy_picks_unlabeled_records(strategy, dataset):
+    for _ in range(len(dataset) - 4):
+        pick = strategy.pick(dataset)
+        assert pick.record.label is None
+        pick.record.label_as("food")
+    with pytest.raises(NoMoreUnlabeledRecord):
+        strategy.pick(dataset)
+
+
+def test_feature_cache(dataset):
+    model = get_default_model()
+    cache = FeatureCache(model[:-1])
+    X = cache.get(dataset)
+    assert X.shape[0] == len(dataset)
+    dataset[5].label_as("food")
+    assert cache.get(dataset) is X
+    cache.invalidate()
+    assert cache.get(dataset) is not X
+
+
+def test_hashing_features_are_stateless(dataset):
+    preprocessor = get_default_model(Vectorizer.HASHING)[:-1]
+    X = preprocessor.fit_transform(dataset.features)
+    assert X.shape[1] == 1 + 4096 + 2 * 1365 + 1
+    chunk = preprocessor.fit_transform(dataset.features.iloc[5:10])
+    assert (chunk != X[5:10]).nnz == 0
+
+
+@pytest.fixture
+def synthetic_dataset(make_dataset) -> Dataset:
+    return make_dataset(size=300, n_labeled=150, daily=True, numbered=True)
+
+
+def test_refit_policy(synthetic_dataset):
+    dataset = synthetic_dataset
+    refit = RefitPolicy(every=2, warm_start_rounds=5)
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=refit)
+    strategy.fit(dataset)
+    assert strategy.warm_starts == 0
+
+    strategy.pick(dataset).record.label_as("food")
+    assert not strategy.needs_refit(dataset)
+    strategy.pick(dataset).record.label_as("energy")
+    assert strategy.needs_refit(dataset)
+    strategy.pick(dataset)
+    assert strategy.warm_starts == 1
+
+    # A new label requires training from scratch
+    strategy.pick(dataset).record.label_as("taxes")
+    strategy.pick(dataset).record.label_as("taxes")
+    strategy.pick(dataset)
+    assert strategy.warm_starts == 0
+    assert "taxes" in strategy.classifier.classes_
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [RandomStrategy(), AmbiguousStrategy(model=get_default_model(), refit=True)],
+)
+def test_pick_batch(strategy, synthetic_dataset):
+    picks = strategy.pick_batch(synthetic_dataset, k=10, exclude={150, 151})
+    indices = {pick.record.index for pick in picks}
+    assert len(indices) == 10
+    assert not indices & {150, 151}
+    assert all(pick.record.label is None for pick in picks)
+    for pick in picks:
+        if pick.scores is not None:
+            # Scores come with the labels they're the probabilities of
+            assert len(pick.scores) == len(pick.labels)
+            assert set(pick.labels) <= set(synthetic_dataset.label_counts)
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [
+        RandomStrategy(diverse=True),
+        AmbiguousStrategy(model=get_default_model(), refit=True, diverse=True),
+    ],
+)
+def test_pick_batch_diverse(strategy, synthetic_dataset):
+    picks = strategy.pick_batch(synthetic_dataset, k=10)
+    descriptions = {normalize_description(pick.record.data["description"]) for pick in picks}
+    assert descriptions == {"CB CARREFOUR", "CB SNCF", "CB EDF"}
+    assert len(picks) == 3
+
+
+def test_candidate_pool(synthetic_dataset):
+    dataset = synthetic_dataset
+    pool = CandidatePool(size=20, rescore_every=2)
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=True, pool=pool)
+    strategy.pick(dataset).record.label_as("food")
+    assert strategy.rounds == 0
+    strategy.pick(dataset).record.label_as("food")
+    strategy.pick(dataset).record.label_as("food")
+    assert strategy.rounds == 2
+    strategy.pick(dataset)
+    assert strategy.rounds == 0
+
+
+def test_stratified_pool_order():
+    strategy = AmbiguousStrategy(model=get_default_model())
+    rows = np.arange(10)
+    strata = np.array([0, 0, 0, 0, 0, 0, 0, 1, 1, 2])
+    order = strategy.get_pool_order(rows, strata)
+    assert sorted(order) == rows.tolist()
+    assert set(strata[order[:3]]) == {0, 1, 2}
+
+
+def test_pick_batch_from_snapshot(synthetic_dataset):
+    dataset = synthetic_dataset
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=RefitPolicy(every=2))
+    snapshot = dataset.snapshot()
+    picks = strategy.pick_batch(snapshot, k=2)
+    # Labeling the live dataset doesn't change the snapshot being scored
+    dataset.set_label(picks[0].record.index, "food")
+    assert snapshot.labels[picks[0].record.index] is None
+    assert strategy.is_fitted_on(snapshot) and not strategy.needs_refit(dataset)
+
+    pick = strategy.peek(dataset)
+    assert pick.record.dataset is dataset
+    assert pick.record.index == picks[1].record.index
+
+
+def test_pick_batch_keeps_probabilities_from_scoring(synthetic_dataset, monkeypatch):
+    strategy = AmbiguousStrategy(model=get_default_model(), refit=True, diverse=True)
+    strategy.pick_batch(synthetic_dataset, k=3)
+    predicted = []
+    predict_proba = strategy.predict_proba
+    monkeypatch.setattr(
+        strategy,
+        "predict_proba",
+        lambda dataset, rows: predicted.append(rows) or predict_proba(dataset, rows),
+    )
+    picks = strategy.pick_batch(synthetic_dataset, k=3)
+    assert not predicted
+    rows = np.array([pick.record.index for pick in picks])
+    expected = strategy.classifier.predict_proba(strategy.features.get(synthetic_dataset)[rows])
+    np.testing.assert_allclose([pick.scores for pick in picks], expected)
@@ -1,8 +1,14 @@
 from pathlib import Path
 
+import pandas as pd
 import pytest
 
 from budget.transaction_loader.banque_populaire import BanquePopulaireLoader
+from budget.transaction_loader.base import (
+    TRANSACTION_SCHEMA,
+    SchemaValidationException,
+    normalize_dates,
+)
 from budget.transaction_loader.credit_lyonnais import CreditLyonnaisLoader
 
 
@@ -17,3 +23,48 @@ def test_banque_populaire_loader(loader, path):
     path = Path(__file__).parent / "data" / "transactions" / path
     df = loader.read(path)
     assert not df.empty
+
+
+@pytest.mark.parametrize(
+    argnames=("loader", "path"),
+    argvalues=[
+        (BanquePopulaireLoader(), "banque_populaire.csv"),
+        (CreditLyonnaisLoader(), "credit_lyonnais.csv"),
+    ],
+)
+@pytest.mark.parametrize("chunksize", [1, 2, 4])
+def test_loader_read_iter(loader, path, chunksize):
+    path = Path(__file__).parent / "data" / "transactions" / path
+    chunks = list(loader.read_iter(path, chunksize=chunksize))
+    assert all(len(chunk) <= chunksize for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks), loader.read(path))
+
+
+def test_normalize_dates():
+    dates = pd.Series(["01/02/2024", "29/02/2024", "01/02/2024"], index=[3, 4, 5])
+    event_date, event_datetime = normalize_dates(dates)
+    assert event_date.tolist() == ["2024-02-01", "2024-02-29", "2024-02-01"]
+    assert event_datetime.tolist() == [
+        "2024-02-01T00:00:00Z",
+        "2024-02-29T00:00:00Z",
+        "2024-02-01T00:00:00Z",
+    ]
+    assert event_date.index.equals(dates.index)
+
+
+def test_schema_validation_reports_invalid_rows():
+    df = pd.DataFrame(
+        {
+            "event_date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+            "event_datetime": ["2024-01-01T00:00:00Z"] * 3,
+            "description": ["a", None, 3],
+            "amount": [1.0, float("nan"), -2.5],
+            "category": ["c"] * 3,
+            "subcategory": ["s"] * 3,
+        }
+    )
+    TRANSACTION_SCHEMA.validate(df.assign(description="a"))
+    with pytest.raises(SchemaValidationException, match=r"description .* invalid rows: \[1, 2\]"):
+        TRANSACTION_SCHEMA.validate(df)
+    with pytest.raises(SchemaValidationException, match=r"amount \(expected float, dtype int64"):
+        TRANSACTION_SCHEMA.validate(df.assign(description="a", amount=1))
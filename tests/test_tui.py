@@ -0,0 +1,31 @@
+import pandas as pd
+
+from budget.ml.active_learning.models import Dataset
+from budget.ml.active_learning.strategies import Pick
+from budget.ml.active_learning.tui import PickHistory
+
+
+def test_pick_history():
+    transactions = pd.DataFrame(
+        {"event_date": "2024-01-01", "description": list("abcdef"), "amount": -1.0}
+    )
+    dataset = Dataset.from_dataframe(transactions)
+    history = PickHistory(size=3)
+    assert history.back() is None
+    for index in range(4):
+        history.push(Pick(dataset[index]))
+    history.push(Pick(dataset[3], scores=[0.5, 0.5]))
+    assert [pick.record.index for pick in history.picks] == [1, 2, 3]
+    assert history.picks[-1].scores == [0.5, 0.5]
+
+    assert history.back().record.index == 2
+    assert history.back().record.index == 1
+    assert history.back() is None
+    assert history.browsing
+    assert history.forward().record.index == 2
+    assert history.forward().record.index == 3
+    assert history.forward() is None
+    assert not history.browsing
+
+    history.push(Pick(dataset[4]), replace=True)
+    assert [pick.record.index for pick in history.picks] == [1, 2, 4]